@@ -3,13 +3,26 @@ Enterprise Log Anomaly Detection System
 Main Flask application
 """
 import os
+import hashlib
 import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from flask import Flask, render_template, request, jsonify, session as flask_session
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 
+# orjson is optional - used for fast serialization of large results payloads
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -37,9 +50,28 @@ logger = logging.getLogger(__name__)
 # FLASK APP SETUP
 # ============================================================================
 
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson for dict-heavy responses"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__, template_folder='ui/templates', static_folder='ui/static')
 app.config.update(FLASK_CONFIG)
 
+if ORJSON_AVAILABLE:
+    app.json = ORJSONProvider(app)
+    logger.info("Using orjson for JSON responses")
+else:
+    logger.info("orjson not installed, using stdlib json for responses")
+
 # Initialize detection engine with optional LLM enrichment
 # Set ENABLE_LLM=true and OPENAI_API_KEY in environment to enable
 ENABLE_LLM = os.getenv('ENABLE_LLM', 'false').lower() == 'true'
@@ -73,9 +105,49 @@ def get_or_create_session():
         return sess
 
 
+_ALLOWED_EXTS = frozenset(('log', 'csv', 'txt'))
+
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'log', 'csv', 'txt'}
+    dot = filename.rfind('.')
+    return dot > 0 and filename[dot + 1:].lower() in _ALLOWED_EXTS
+
+
+# ============================================================================
+# DETECTION RESULT CACHE
+# ============================================================================
+
+# Format tag for session-stored results; bump when the stored shape changes
+RESULTS_FORMAT_VERSION = 'v2'
+
+# Detection results keyed by (content hash, model, model version) so re-runs
+# of an identical file skip the parse/extract/detect pipeline entirely.
+# Bounded; oldest entries are evicted first. The model version is bumped on
+# every retrain so stale results are never served after a model change.
+DETECTION_CACHE_MAX_ENTRIES = 16
+_detection_cache = {}
+_model_version = 0
+
+
+def hash_file(filepath):
+    """Compute a content hash by streaming the file in 1MB blocks"""
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as f:
+        while True:
+            block = f.read(1 << 20)
+            if not block:
+                break
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _cache_detection_results(cache_key, cached_entry):
+    """Store detection results in the bounded cache"""
+    if len(_detection_cache) >= DETECTION_CACHE_MAX_ENTRIES:
+        oldest_key = next(iter(_detection_cache))
+        del _detection_cache[oldest_key]
+    _detection_cache[cache_key] = cached_entry
 
 
 # ============================================================================
@@ -86,36 +158,16 @@ def allowed_file(filename):
 def index():
     """Main dashboard"""
     sess = get_or_create_session()
-    
-    # Retrieve session data - ensure results are dictionaries
-    results = sess.get('results')
-    
-    # Handle corrupted or old session data
-    if results:
-        try:
-            if isinstance(results, list) and len(results) > 0:
-                # Check if first item is a dictionary
-                if isinstance(results[0], dict):
-                    # Already in correct format
-                    pass
-                elif isinstance(results[0], str):
-                    # Corrupted data - clear it
-                    logger.warning("Corrupted session data detected (strings instead of dicts), clearing session")
-                    sess.clear()
-                    results = None
-                elif hasattr(results[0], 'to_dict'):
-                    # Convert objects to dictionaries
-                    results = [r.to_dict() for r in results]
-                else:
-                    # Unknown format - clear
-                    logger.warning(f"Unknown session data format: {type(results[0])}, clearing session")
-                    sess.clear()
-                    results = None
-        except Exception as e:
-            logger.error(f"Error processing session results: {e}")
-            # Clear corrupted session data
+
+    # Branch on the format tag written at detection time instead of
+    # inspecting the results themselves - O(1) on every dashboard render
+    if sess.get('results_format') == RESULTS_FORMAT_VERSION:
+        results = sess.get('results')
+    else:
+        if sess.get('results') is not None:
+            logger.warning("Session results from an old format, clearing session")
             sess.clear()
-            results = None
+        results = None
     
     session_data = {
         'current_file': sess.get('current_file'),
@@ -127,13 +179,210 @@ def index():
     return render_template('dashboard.html', session_data=session_data)
 
 
+class DetectionError(Exception):
+    """Detection pipeline failure with an HTTP status for the response"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def run_detection(filepath, filename, model, file_hash=None):
+    """
+    Parse, extract features and run detection (no Flask objects involved)
+
+    Runs on a worker thread, so it must not touch the request or session.
+    Returns (results_data, stats, file_type, record_count); failures are
+    raised as DetectionError and surfaced by the job polling endpoint.
+    """
+    global _model_version
+
+    # Short-circuit: identical content + model + model version was already analyzed
+    if file_hash:
+        cache_key = (file_hash, model, _model_version)
+        cached = _detection_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Detection cache hit for {filename} ({model})")
+            return cached
+
+    # Parse file
+    try:
+        records, parse_errors, file_type, schema_info = parser.parse(filepath)
+        logger.info(f"Parsed {len(records)} records from {file_type} file")
+        if parse_errors:
+            logger.warning(f"Parsing encountered {len(parse_errors)} errors")
+    except Exception as e:
+        logger.error(f"Parsing error: {e}")
+        raise DetectionError(f'Failed to parse file: {str(e)}', 400)
+
+    # Extract features FROM UPLOADED FILE
+    try:
+        if file_type == 'generic':
+            features, feature_info = feature_extractor.extract(records, file_type, schema_info)
+        else:
+            features, feature_info = feature_extractor.extract(records, file_type)
+        logger.info(f"Extracted {features.shape[1]} features from {features.shape[0]} records")
+    except Exception as e:
+        logger.error(f"Feature extraction error: {e}")
+        raise DetectionError(f'Failed to extract features: {str(e)}', 400)
+
+    # Run detection ON UPLOADED DATA with automatic model retraining
+    max_retries = 2
+    for attempt in range(max_retries):
+        try:
+            results, stats = detection_engine.detect_anomalies(
+                records=records,
+                features=features,
+                file_type=file_type,
+                model_type=model,
+                feature_info=feature_info
+            )
+            logger.info(f"Detection complete: {len(results)} records, {stats['total_anomalies']} anomalies")
+            break  # Success!
+
+        except ValueError as e:
+            error_msg = str(e)
+
+            # Check if it's a feature mismatch error
+            if 'features' in error_msg and 'expecting' in error_msg:
+                if attempt < max_retries - 1:
+                    logger.warning(f"Feature mismatch detected: {error_msg}")
+                    logger.info(f"Auto-retraining {model} model with {features.shape[1]} features from uploaded data...")
+
+                    # Retrain the model using the uploaded data
+                    try:
+                        detection_engine.retrain_model_on_data(
+                            model_type=model,
+                            training_data=features
+                        )
+                        logger.info(f"✓ Model retrained successfully with {features.shape[1]} features")
+                        # Model changed: invalidate cached results for the old model
+                        _model_version += 1
+                        # Retry detection with newly trained model
+                        continue
+                    except Exception as retrain_error:
+                        logger.error(f"Failed to retrain model: {retrain_error}")
+                        raise DetectionError(
+                            f'Model mismatch and retraining failed: {str(retrain_error)}', 500
+                        )
+                else:
+                    raise DetectionError(
+                        f'Feature mismatch persists after retraining: {error_msg}', 500
+                    )
+            else:
+                # Different ValueError, don't retry
+                logger.error(f"Detection error: {e}")
+                raise DetectionError(f'Failed to run detection: {error_msg}', 400)
+
+        except Exception as e:
+            logger.error(f"Detection error: {e}")
+            raise DetectionError(f'Failed to run detection: {str(e)}', 400)
+
+    # detect_anomalies already returns the materialized result dicts
+    entry = (results, stats, file_type, len(records))
+
+    if file_hash:
+        cache_key = (file_hash, model, _model_version)
+        _cache_detection_results(cache_key, entry)
+
+    return entry
+
+
+def store_detection_results(sess, filepath, filename, model, entry):
+    """Store a finished detection run in the session (request context only)"""
+    results_data, stats, file_type, record_count = entry
+
+    # Store results in session: the big results payload goes to a sidecar
+    # file once, everything else is written with a single batched save
+    sess.set_payload('results', results_data)
+    sess.update({
+        'current_file': filename,
+        'current_filepath': str(filepath),
+        'current_model': model,
+        'stats': stats,
+        'file_type': file_type,
+        'record_count': record_count,
+        'results_format': RESULTS_FORMAT_VERSION,
+    })
+
+    # Mirror the small fields into the signed cookie so lightweight routes
+    # (e.g. /api/session polling) never need to touch the storage backend
+    flask_session['current_file'] = filename
+    flask_session['current_model'] = model
+    flask_session['has_results'] = True
+
+    logger.info(f"Results stored in session {sess.session_id}")
+
+
+# ============================================================================
+# BACKGROUND DETECTION JOBS
+# ============================================================================
+
+# Detection runs off the request thread so the HTTP worker is free to serve
+# other routes (and the client gets immediate feedback instead of a stalled
+# request). Single worker: the detection engine keeps per-run state, so
+# concurrent runs would race each other.
+_job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='detect')
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def submit_detection_job(filepath, filename, model, file_hash=None):
+    """Queue a detection run on the worker thread, returning its job id"""
+    job_id = str(uuid.uuid4())
+    future = _job_executor.submit(run_detection, filepath, filename, model, file_hash)
+    with _jobs_lock:
+        _jobs[job_id] = {
+            'future': future,
+            'filepath': filepath,
+            'filename': filename,
+            'model': model,
+        }
+    logger.info(f"Detection job {job_id} queued for {filename} ({model})")
+    return job_id
+
+
+def start_detection(filepath, filename, model, file_hash=None):
+    """Submit a detection job and build the 202 response the routes share"""
+    job_id = submit_detection_job(filepath, filename, model, file_hash)
+    return jsonify({'success': True, 'job_id': job_id}), 202
+
+
+@app.route('/api/job/<job_id>')
+def get_job_status(job_id):
+    """Poll a background detection job; stores results once it completes"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+
+    future = job['future']
+    if not future.done():
+        return jsonify({'state': 'running'})
+
+    with _jobs_lock:
+        _jobs.pop(job_id, None)
+
+    try:
+        entry = future.result()
+    except DetectionError as e:
+        return jsonify({'state': 'error', 'success': False, 'error': str(e)}), e.status
+    except Exception as e:
+        logger.exception(f"Detection job {job_id} failed: {e}")
+        return jsonify({'state': 'error', 'success': False, 'error': f'Unexpected error: {str(e)}'}), 500
+
+    sess = get_or_create_session()
+    store_detection_results(sess, job['filepath'], job['filename'], job['model'], entry)
+    return jsonify({'state': 'done', 'success': True})
+
+
 @app.route('/detect', methods=['POST'])
 def detect():
     """Run anomaly detection with automatic model retraining on mismatch"""
     try:
         # Get or create session
         sess = get_or_create_session()
-        
+
         # Check if this is a re-run on existing file
         is_rerun = request.form.get('rerun') == 'true'
         logger.info(f"Detection request - is_rerun: {is_rerun}, has_file: {'file' in request.files}")
@@ -141,21 +390,20 @@ def detect():
         if is_rerun:
             # Re-run detection on previously uploaded file
             current_file = sess.get('current_file')
+            current_filepath = sess.get('current_filepath')
             logger.info(f"Re-run mode - current_file in session: {current_file}")
-            
-            if not current_file:
+
+            if not current_file or not current_filepath:
                 logger.error("Re-run requested but no file in session")
                 return jsonify({'success': False, 'error': 'No file in session. Please upload a new file.'}), 400
-            
-            # Find the most recent file with this name
-            matching_files = sorted(UPLOADS_DIR.glob(f"*_{current_file}"), reverse=True)
-            logger.info(f"Found {len(matching_files)} matching files for: {current_file}")
-            
-            if not matching_files:
-                logger.error(f"No matching files found in {UPLOADS_DIR}")
+
+            # Exact path was stored at upload time - single existence check,
+            # no directory scan, no ambiguity between same-named uploads
+            filepath = Path(current_filepath)
+            if not filepath.is_file():
+                logger.error(f"Previous upload no longer exists: {filepath}")
                 return jsonify({'success': False, 'error': 'Previous file not found. Please upload a new file.'}), 400
-            
-            filepath = matching_files[0]
+
             filename = current_file
             logger.info(f"Re-running detection on: {filepath}")
             
@@ -193,102 +441,79 @@ def detect():
         
         if model not in ['isolation_forest', 'autoencoder']:
             return jsonify({'success': False, 'error': 'Invalid model'}), 400
-        
-        # Parse file
-        try:
-            records, parse_errors, file_type, schema_info = parser.parse(filepath)
-            logger.info(f"Parsed {len(records)} records from {file_type} file")
-            if parse_errors:
-                logger.warning(f"Parsing encountered {len(parse_errors)} errors")
-        except Exception as e:
-            logger.error(f"Parsing error: {e}")
-            return jsonify({'success': False, 'error': f'Failed to parse file: {str(e)}'}), 400
-        
-        # Extract features FROM UPLOADED FILE
-        try:
-            if file_type == 'generic':
-                features, feature_info = feature_extractor.extract(records, file_type, schema_info)
-            else:
-                features, feature_info = feature_extractor.extract(records, file_type)
-            logger.info(f"Extracted {features.shape[1]} features from {features.shape[0]} records")
-        except Exception as e:
-            logger.error(f"Feature extraction error: {e}")
-            return jsonify({'success': False, 'error': f'Failed to extract features: {str(e)}'}), 400
-        
-        # Run detection ON UPLOADED DATA with automatic model retraining
-        max_retries = 2
-        for attempt in range(max_retries):
-            try:
-                results, stats = detection_engine.detect_anomalies(
-                    records=records,
-                    features=features,
-                    file_type=file_type,
-                    model_type=model,
-                    feature_info=feature_info
-                )
-                logger.info(f"Detection complete: {len(results)} records, {stats['total_anomalies']} anomalies")
-                break  # Success!
-                
-            except ValueError as e:
-                error_msg = str(e)
-                
-                # Check if it's a feature mismatch error
-                if 'features' in error_msg and 'expecting' in error_msg:
-                    if attempt < max_retries - 1:
-                        logger.warning(f"Feature mismatch detected: {error_msg}")
-                        logger.info(f"Auto-retraining {model} model with {features.shape[1]} features from uploaded data...")
-                        
-                        # Retrain the model using the uploaded data
-                        try:
-                            detection_engine.retrain_model_on_data(
-                                model_type=model,
-                                training_data=features
-                            )
-                            logger.info(f"✓ Model retrained successfully with {features.shape[1]} features")
-                            # Retry detection with newly trained model
-                            continue
-                        except Exception as retrain_error:
-                            logger.error(f"Failed to retrain model: {retrain_error}")
-                            return jsonify({
-                                'success': False, 
-                                'error': f'Model mismatch and retraining failed: {str(retrain_error)}'
-                            }), 500
-                    else:
-                        return jsonify({
-                            'success': False, 
-                            'error': f'Feature mismatch persists after retraining: {error_msg}'
-                        }), 500
-                else:
-                    # Different ValueError, don't retry
-                    raise
-                    
-            except Exception as e:
-                logger.error(f"Detection error: {e}")
-                return jsonify({'success': False, 'error': f'Failed to run detection: {str(e)}'}), 400
-        
-        # Store results in session
-        results_data = [r.to_dict() for r in results]
-        sess.set('current_file', filename)
-        sess.set('current_model', model)
-        sess.set('results', results_data)
-        sess.set('stats', stats)
-        sess.set('file_type', file_type)
-        sess.set('record_count', len(records))
-        
-        logger.info(f"Results stored in session {sess.session_id}")
-        
-        return jsonify({'success': True})
-    
+
+        return start_detection(filepath, filename, model, file_hash=hash_file(filepath))
+
     except Exception as e:
         logger.exception(f"Unexpected error in /detect: {e}")
         return jsonify({'success': False, 'error': f'Unexpected error: {str(e)}'}), 500
 
 
+@app.route('/detect_stream', methods=['POST', 'PUT'])
+def detect_stream():
+    """
+    Run anomaly detection on a raw request body streamed directly to disk
+
+    Bypasses the multipart parser entirely: the body is copied to the uploads
+    directory in large fixed-size blocks, so big uploads stay I/O-bound instead
+    of CPU-bound. Filename and model selection come from the X-Filename and
+    X-Model headers. The multipart /detect route remains as fallback.
+    """
+    try:
+        sess = get_or_create_session()
+        sess.clear()
+
+        filename = request.headers.get('X-Filename', '')
+        if not filename:
+            logger.error("No X-Filename header in streaming upload")
+            return jsonify({'success': False, 'error': 'No file provided'}), 400
+
+        if not allowed_file(filename):
+            logger.error(f"Invalid file type: {filename}")
+            return jsonify({'success': False, 'error': 'Invalid file type'}), 400
+
+        model = request.headers.get('X-Model', 'isolation_forest')
+        if model not in ['isolation_forest', 'autoencoder']:
+            return jsonify({'success': False, 'error': 'Invalid model'}), 400
+        logger.info(f"Model selected: {model}")
+
+        # Stream the raw body to disk in 1MB blocks (bypasses MultiPartParser)
+        filename = secure_filename(filename)
+        filepath = UPLOADS_DIR / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+
+        block_size = 1 << 20  # 1MB blocks cut syscall count vs the 8KB default
+        hasher = hashlib.blake2b(digest_size=16)  # Content hash computed in the same pass
+        with open(filepath, 'wb', buffering=block_size) as f:
+            while True:
+                chunk = request.stream.read(block_size)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                f.write(chunk)
+        logger.info(f"File streamed to disk: {filepath}")
+
+        return start_detection(filepath, filename, model, file_hash=hasher.hexdigest())
+
+    except Exception as e:
+        logger.exception(f"Unexpected error in /detect_stream: {e}")
+        return jsonify({'success': False, 'error': f'Unexpected error: {str(e)}'}), 500
+
+
 @app.route('/api/session')
 def get_session_info():
     """Get current session info (API)"""
+    # Small fields are mirrored in the signed cookie, so polling this
+    # endpoint costs no disk I/O once a session exists
+    if 'session_id' in flask_session:
+        return jsonify({
+            'session_id': flask_session['session_id'],
+            'current_file': flask_session.get('current_file'),
+            'current_model': flask_session.get('current_model'),
+            'has_results': flask_session.get('has_results', False),
+        })
+
     sess = get_or_create_session()
-    
     return jsonify({
         'session_id': sess.session_id,
         'current_file': sess.get('current_file'),
@@ -306,7 +531,7 @@ def clear_session_route():
         if sess:
             sess.clear()
     
-    flask_session.pop('session_id', None)
+    flask_session.clear()
     return jsonify({'success': True})
 
 
@@ -319,7 +544,7 @@ def new_session():
         if sess:
             sess.clear()
     
-    flask_session.pop('session_id', None)
+    flask_session.clear()
     logger.info("New session started - cleared previous session")
     return render_template('dashboard.html', session_data={
         'current_file': None,
@@ -353,15 +578,24 @@ def internal_error(error):
 
 
 # ============================================================================
-# BEFORE/AFTER HANDLERS
+# BACKGROUND SESSION CLEANUP
 # ============================================================================
 
-@app.before_request
-def before_request():
-    """Execute before each request"""
-    # Cleanup expired sessions periodically
-    if request.path == '/':
-        cleanup_sessions()
+SESSION_CLEANUP_INTERVAL = 60  # seconds
+
+
+def _session_cleanup_loop():
+    """Periodically clean up expired sessions, off the request critical path"""
+    while True:
+        try:
+            cleanup_sessions()
+        except Exception as e:
+            logger.error(f"Session cleanup failed: {e}")
+        time.sleep(SESSION_CLEANUP_INTERVAL)
+
+
+cleanup_thread = threading.Thread(target=_session_cleanup_loop, daemon=True)
+cleanup_thread.start()
 
 
 # ============================================================================
@@ -4,6 +4,7 @@ Extracts numerical features from ANY CSV data for ML models
 Features inform ML about rarity, NOT classification
 """
 import numpy as np
+import pandas as pd
 from typing import List, Dict, Tuple, Any, Union
 import logging
 import re
@@ -28,41 +29,127 @@ class HTTPFeatureExtractor:
     CMD_PATTERNS = [r"rm\s+-rf", r";\s*cat", r"&&\s*whoami"]
     PRIV_ESC_PATTERNS = [r"/admin", r"sudo", r"privilege"]
     BAD_AGENTS = ["sqlmap", "nikto", "nmap", "curl", "python"]
-    
+
+    # Each group compiled into one alternation at class load, so a feature
+    # flag costs a single C-level scan of the URI instead of one re.search
+    # per pattern; the substring groups join as escaped literals
+    _TRAVERSAL_RE = re.compile('|'.join(f'(?:{p})' for p in TRAVERSAL_PATTERNS))
+    _SQLI_RE = re.compile('|'.join(f'(?:{p})' for p in SQLI_PATTERNS))
+    _XSS_RE = re.compile('|'.join(map(re.escape, XSS_PATTERNS)))
+    _CMD_RE = re.compile('|'.join(f'(?:{p})' for p in CMD_PATTERNS))
+    _PRIV_ESC_RE = re.compile('|'.join(f'(?:{p})' for p in PRIV_ESC_PATTERNS))
+    _EXFIL_RE = re.compile('/export|/download|/backup')
+    _BAD_AGENT_RE = re.compile('|'.join(map(re.escape, BAD_AGENTS)))
+
     def extract_features(self, records: List[HTTPRecord]) -> Tuple[np.ndarray, Dict[str, Any]]:
         """Extract features from HTTP log records"""
-        features_list = []
-        
-        # Calculate global statistics
-        response_sizes = [r.response_size for r in records]
-        durations = [r.duration for r in records]
-        uri_lengths = [len(r.uri or '') for r in records]
-        
-        # IP-based statistics
-        ip_request_counts = {}
-        ip_uri_sets = {}
-        for r in records:
-            ip = r.client_ip
-            ip_request_counts[ip] = ip_request_counts.get(ip, 0) + 1
-            if ip not in ip_uri_sets:
-                ip_uri_sets[ip] = set()
-            ip_uri_sets[ip].add(r.uri)
-        
-        stats = {
-            'mean_response_size': np.mean(response_sizes) if response_sizes else 0,
-            'std_response_size': np.std(response_sizes) if response_sizes else 1,
-            'mean_duration': np.mean(durations) if durations else 0,
-            'std_duration': np.std(durations) if durations else 1,
-            'mean_uri_length': np.mean(uri_lengths) if uri_lengths else 0,
-            'std_uri_length': np.std(uri_lengths) if uri_lengths else 1,
-        }
-        
-        for record in records:
-            features = self._extract_single_record(record, stats, ip_request_counts, ip_uri_sets)
-            features_list.append(features)
-        
-        feature_matrix = np.array(features_list, dtype=np.float32)
-        
+        # Structure-of-arrays pass: pull each field into a flat column once,
+        # then every feature is a vectorized expression into a preallocated
+        # (N, 19) matrix instead of 19 Python appends per record
+        n = len(records)
+        uris = [r.uri or '' for r in records]
+        uris_lower = [u.lower() for u in uris]
+        decoded_uris = [unquote(u) for u in uris_lower]
+        agents_lower = [(r.user_agent or '').lower() for r in records]
+        ips = np.array([r.client_ip for r in records], dtype=object)
+
+        uri_lengths = np.fromiter(map(len, uris), dtype=np.float64, count=n)
+        response_sizes = np.fromiter(
+            (r.response_size for r in records), dtype=np.float64, count=n
+        )
+        durations = np.fromiter(
+            (r.duration for r in records), dtype=np.float64, count=n
+        )
+        status_codes = np.fromiter(
+            (r.status_code for r in records), dtype=np.int16, count=n
+        )
+
+        # Mean/std for the three numeric columns in one fused pass over a
+        # stacked (N, 3) matrix; a zero std means the column is constant,
+        # so dividing by 1 yields the same all-zero z-scores branch-free.
+        # The stats are cast to float32 so the z-score arithmetic below
+        # stays in float32 end to end (the matrix dtype) with no widened
+        # intermediate
+        num = np.stack([uri_lengths, response_sizes, durations], axis=1)
+        mu = num.mean(axis=0).astype(np.float32) if n else np.zeros(3, np.float32)
+        sigma = num.std(axis=0).astype(np.float32) if n else np.ones(3, np.float32)
+        sigma = np.where(sigma > 0, sigma, np.float32(1.0))
+
+        feature_matrix = np.empty((n, 19), dtype=np.float32)
+        feature_matrix[:, 0] = uri_lengths
+        feature_matrix[:, 1] = response_sizes
+        feature_matrix[:, 2] = durations
+        feature_matrix[:, 3] = status_codes
+
+        # 4/5: per-IP request rate and unique-URI count, via integer codes
+        # instead of a dict of sets: hash-based factorization codes the
+        # string columns in O(N) (no string sorting), then requests per IP
+        # is a bincount of the IP codes and unique URIs per IP a bincount
+        # of the deduplicated 64-bit (ip, uri) pair keys
+        ip_codes, ip_uniques = pd.factorize(ips)
+        uri_codes, uri_uniques = pd.factorize(np.array(uris, dtype=object))
+        ip_counts = np.bincount(ip_codes, minlength=len(ip_uniques))
+        pair_keys = (ip_codes.astype(np.int64) << 32) | uri_codes
+        unique_pairs = np.unique(pair_keys)
+        uri_counts = np.bincount(unique_pairs >> 32, minlength=len(ip_uniques))
+        feature_matrix[:, 4] = ip_counts[ip_codes]
+        feature_matrix[:, 5] = uri_counts[ip_codes]
+
+        # 6-10: binary security-pattern features (inform ML, don't classify);
+        # one combined-alternation scan per group per URI
+        trav_search = self._TRAVERSAL_RE.search
+        feature_matrix[:, 6] = np.fromiter(
+            (trav_search(du) is not None for du in decoded_uris),
+            dtype=np.float64, count=n
+        )
+        sqli_search = self._SQLI_RE.search
+        feature_matrix[:, 7] = np.fromiter(
+            (sqli_search(ul) is not None for ul in uris_lower),
+            dtype=np.float64, count=n
+        )
+        xss_search = self._XSS_RE.search
+        feature_matrix[:, 8] = np.fromiter(
+            (xss_search(ul) is not None for ul in uris_lower),
+            dtype=np.float64, count=n
+        )
+        cmd_search = self._CMD_RE.search
+        feature_matrix[:, 9] = np.fromiter(
+            (cmd_search(ul) is not None for ul in uris_lower),
+            dtype=np.float64, count=n
+        )
+        priv_search = self._PRIV_ESC_RE.search
+        feature_matrix[:, 10] = np.fromiter(
+            (priv_search(ul) is not None for ul in uris_lower),
+            dtype=np.float64, count=n
+        )
+
+        # 11: data exfiltration (substring markers or oversized response)
+        exfil_search = self._EXFIL_RE.search
+        feature_matrix[:, 11] = np.fromiter(
+            (exfil_search(ul) is not None for ul in uris_lower),
+            dtype=bool, count=n
+        ) | (response_sizes > 1_000_000)
+
+        # 12: suspicious agent
+        agent_search = self._BAD_AGENT_RE.search
+        feature_matrix[:, 12] = np.fromiter(
+            (agent_search(ua) is not None for ua in agents_lower),
+            dtype=np.float64, count=n
+        )
+
+        # 13-15: status class and method flags
+        feature_matrix[:, 13] = (status_codes >= 400) & (status_codes < 500)
+        feature_matrix[:, 14] = (status_codes >= 500) & (status_codes < 600)
+        feature_matrix[:, 15] = np.fromiter(
+            (r.method == 'POST' for r in records), dtype=bool, count=n
+        )
+
+        # 16-18: z-scores for all three numeric columns in one float32
+        # expression over the already-stored float32 columns 0-2
+        z = (feature_matrix[:, :3] - mu) / sigma
+        np.clip(z, -5, 5, out=z)
+        feature_matrix[:, 16:19] = z
+
         feature_info = {
             'feature_names': [
                 'uri_length',
@@ -90,105 +177,112 @@ class HTTPFeatureExtractor:
         }
         
         logger.info(f"Extracted {feature_matrix.shape[0]} records with {feature_matrix.shape[1]} features")
-        
+
         return feature_matrix, feature_info
-    
-    def _extract_single_record(
-        self, 
-        record: HTTPRecord, 
-        stats: Dict[str, float],
-        ip_request_counts: Dict[str, int],
-        ip_uri_sets: Dict[str, set]
-    ) -> List[float]:
-        """Extract feature vector for a single HTTP record"""
-        features = []
-        
-        uri_str = record.uri or ''
-        user_agent_str = record.user_agent or ''
-        decoded_uri = unquote(uri_str.lower())
-        
-        # 0: URI length (numeric)
-        features.append(float(len(uri_str)))
-        
-        # 1: Response size (numeric)
-        features.append(float(record.response_size))
-        
-        # 2: Duration (numeric)
-        features.append(float(record.duration))
-        
-        # 3: Status code (numeric)
-        features.append(float(record.status_code))
-        
-        # 4: Request rate per IP (numeric)
-        features.append(float(ip_request_counts.get(record.client_ip, 1)))
-        
-        # 5: Unique URI count per IP (numeric)
-        features.append(float(len(ip_uri_sets.get(record.client_ip, set()))))
-        
-        # 6: Has path traversal (binary - informs ML, doesn't classify)
-        has_traversal = any(re.search(p, decoded_uri) for p in self.TRAVERSAL_PATTERNS)
-        features.append(float(has_traversal))
-        
-        # 7: Has SQL injection (binary)
-        has_sqli = any(re.search(p, uri_str.lower()) for p in self.SQLI_PATTERNS)
-        features.append(float(has_sqli))
-        
-        # 8: Has XSS (binary)
-        has_xss = any(p in uri_str.lower() for p in self.XSS_PATTERNS)
-        features.append(float(has_xss))
-        
-        # 9: Has command injection (binary)
-        has_cmd = any(re.search(p, uri_str.lower()) for p in self.CMD_PATTERNS)
-        features.append(float(has_cmd))
-        
-        # 10: Has privilege escalation (binary)
-        has_priv = any(re.search(p, uri_str.lower()) for p in self.PRIV_ESC_PATTERNS)
-        features.append(float(has_priv))
-        
-        # 11: Has data exfiltration (binary)
-        has_exfil = (
-            "/export" in uri_str.lower() or
-            "/download" in uri_str.lower() or
-            "/backup" in uri_str.lower() or
-            record.response_size > 1_000_000
+
+    def extract_features_streaming(
+        self, records: List[HTTPRecord], chunk_size: int = 65536
+    ):
+        """
+        Yield (N, 19) float32 feature chunks instead of one full matrix
+
+        Two passes: the first accumulates the global statistics every
+        feature depends on (numeric mean/std, per-IP request and unique-URI
+        counts), the second fills and yields fixed-size chunks, so peak
+        memory is O(chunk_size) plus the per-IP tallies rather than the
+        whole feature matrix. Chunk values match extract_features exactly.
+        """
+        n = len(records)
+
+        # Pass 1: global stats
+        sums = np.zeros(3)
+        sums_sq = np.zeros(3)
+        ip_request_counts = {}
+        ip_unique_uris = {}
+        seen_pairs = set()
+        for r in records:
+            uri_len = len(r.uri or '')
+            sums += (uri_len, r.response_size, r.duration)
+            sums_sq += (uri_len ** 2, r.response_size ** 2, r.duration ** 2)
+            ip_request_counts[r.client_ip] = ip_request_counts.get(r.client_ip, 0) + 1
+            pair = (r.client_ip, r.uri or '')
+            if pair not in seen_pairs:
+                seen_pairs.add(pair)
+                ip_unique_uris[r.client_ip] = ip_unique_uris.get(r.client_ip, 0) + 1
+        seen_pairs = None
+
+        mu = (sums / n).astype(np.float32) if n else np.zeros(3, np.float32)
+        sigma = (
+            np.sqrt(np.maximum(sums_sq / n - (sums / n) ** 2, 0.0)).astype(np.float32)
+            if n else np.ones(3, np.float32)
         )
-        features.append(float(has_exfil))
-        
-        # 12: Has suspicious agent (binary)
-        has_bad_agent = any(a in user_agent_str.lower() for a in self.BAD_AGENTS)
-        features.append(float(has_bad_agent))
-        
-        # 13: Is client error (binary)
-        features.append(float(400 <= record.status_code < 500))
-        
-        # 14: Is server error (binary)
-        features.append(float(500 <= record.status_code < 600))
-        
-        # 15: Is POST method (binary)
-        features.append(float(record.method == 'POST'))
-        
-        # 16: URI length z-score (numeric)
-        if stats['std_uri_length'] > 0:
-            zscore = (len(uri_str) - stats['mean_uri_length']) / stats['std_uri_length']
-        else:
-            zscore = 0.0
-        features.append(np.clip(zscore, -5, 5))
-        
-        # 17: Response size z-score (numeric)
-        if stats['std_response_size'] > 0:
-            zscore = (record.response_size - stats['mean_response_size']) / stats['std_response_size']
-        else:
-            zscore = 0.0
-        features.append(np.clip(zscore, -5, 5))
-        
-        # 18: Duration z-score (numeric)
-        if stats['std_duration'] > 0:
-            zscore = (record.duration - stats['mean_duration']) / stats['std_duration']
-        else:
-            zscore = 0.0
-        features.append(np.clip(zscore, -5, 5))
-        
-        return features
+        sigma = np.where(sigma > 0, sigma, np.float32(1.0))
+
+        # Pass 2: fill and yield fixed-size chunks
+        for start in range(0, n, chunk_size):
+            chunk = records[start:start + chunk_size]
+            m = len(chunk)
+            uris = [r.uri or '' for r in chunk]
+            uris_lower = [u.lower() for u in uris]
+            decoded_uris = [unquote(u) for u in uris_lower]
+            agents_lower = [(r.user_agent or '').lower() for r in chunk]
+
+            uri_lengths = np.fromiter(map(len, uris), dtype=np.float64, count=m)
+            response_sizes = np.fromiter(
+                (r.response_size for r in chunk), dtype=np.float64, count=m
+            )
+            durations = np.fromiter(
+                (r.duration for r in chunk), dtype=np.float64, count=m
+            )
+            status_codes = np.fromiter(
+                (r.status_code for r in chunk), dtype=np.int16, count=m
+            )
+
+            out = np.empty((m, 19), dtype=np.float32)
+            out[:, 0] = uri_lengths
+            out[:, 1] = response_sizes
+            out[:, 2] = durations
+            out[:, 3] = status_codes
+            out[:, 4] = np.fromiter(
+                (ip_request_counts[r.client_ip] for r in chunk),
+                dtype=np.float64, count=m
+            )
+            out[:, 5] = np.fromiter(
+                (ip_unique_uris[r.client_ip] for r in chunk),
+                dtype=np.float64, count=m
+            )
+
+            for col, pattern, column in (
+                (6, self._TRAVERSAL_RE, decoded_uris),
+                (7, self._SQLI_RE, uris_lower),
+                (8, self._XSS_RE, uris_lower),
+                (9, self._CMD_RE, uris_lower),
+                (10, self._PRIV_ESC_RE, uris_lower),
+                (12, self._BAD_AGENT_RE, agents_lower),
+            ):
+                search = pattern.search
+                out[:, col] = np.fromiter(
+                    (search(s) is not None for s in column),
+                    dtype=np.float64, count=m
+                )
+
+            exfil_search = self._EXFIL_RE.search
+            out[:, 11] = np.fromiter(
+                (exfil_search(ul) is not None for ul in uris_lower),
+                dtype=bool, count=m
+            ) | (response_sizes > 1_000_000)
+
+            out[:, 13] = (status_codes >= 400) & (status_codes < 500)
+            out[:, 14] = (status_codes >= 500) & (status_codes < 600)
+            out[:, 15] = np.fromiter(
+                (r.method == 'POST' for r in chunk), dtype=bool, count=m
+            )
+
+            z = (out[:, :3] - mu) / sigma
+            np.clip(z, -5, 5, out=z)
+            out[:, 16:19] = z
+
+            yield out
 
 
 # ============================================================================
@@ -212,45 +306,51 @@ class GenericFeatureExtractor:
         
         logger.info(f"Extracting features: {len(numeric_columns)} numeric, {len(categorical_columns)} categorical")
         
-        features_list = []
+        # The parser hands over its columnar frame so the rows are not
+        # re-materialized from the per-record dicts; each column is then a
+        # single vectorized pass instead of three Python loops per
+        # categorical column (unique set, counts, binary encode)
+        df = schema_info.get('_dataframe')
+        if df is None or len(df) != len(records):
+            df = pd.DataFrame([r.data for r in records])
+
+        feature_blocks = []
         feature_names = []
-        
-        # Extract numeric features
-        for col in numeric_columns:
-            values = []
-            for record in records:
-                try:
-                    val = float(record.data.get(col, 0))
-                    values.append(val)
-                except (ValueError, TypeError):
-                    values.append(0.0)
-            
-            features_list.append(values)
-            feature_names.append(f"numeric_{col}")
-        
-        # Extract categorical features (one-hot encoding for top categories)
+
+        # Numeric features: coerce unparseable values to 0 in one shot
+        if numeric_columns:
+            num_mat = (
+                df.reindex(columns=numeric_columns)
+                .apply(pd.to_numeric, errors='coerce')
+                .fillna(0)
+                .to_numpy(dtype=np.float32)
+            )
+            feature_blocks.append(num_mat)
+            feature_names.extend(f"numeric_{col}" for col in numeric_columns)
+
+        # Categorical features: one-hot encode the 10 most frequent values
+        # per column. factorize hashes each string once into integer codes;
+        # the one-hot block is then a single gather into an identity matrix
+        # (with a spare zero row for values outside the top 10), so no
+        # object-dtype broadcast or per-cell string compare happens
         for col in categorical_columns[:5]:
-            unique_values = set()
-            for record in records:
-                val = str(record.data.get(col, ''))
-                if val:
-                    unique_values.add(val)
-            
-            value_counts = {}
-            for record in records:
-                val = str(record.data.get(col, ''))
-                value_counts[val] = value_counts.get(val, 0) + 1
-            
-            top_values = sorted(value_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-            top_value_set = {v[0] for v in top_values}
-            
-            for top_val in top_value_set:
-                binary_feature = [1.0 if str(record.data.get(col, '')) == top_val else 0.0 
-                                 for record in records]
-                features_list.append(binary_feature)
-                feature_names.append(f"cat_{col}_{top_val[:20]}")
-        
-        feature_matrix = np.array(features_list, dtype=np.float32).T
+            if col not in df.columns:
+                continue
+            values = df[col].fillna('').astype(str)
+            codes, uniques = pd.factorize(values)
+            counts = np.bincount(codes, minlength=len(uniques))
+            k = min(10, len(uniques))
+            top = np.argsort(-counts, kind='stable')[:k]
+            remap = np.full(len(uniques), k, dtype=np.intp)
+            remap[top] = np.arange(k)
+            cat_mat = np.eye(k + 1, k, dtype=np.float32)[remap[codes]]
+            feature_blocks.append(cat_mat)
+            feature_names.extend(f"cat_{col}_{str(uniques[t])[:20]}" for t in top)
+
+        if feature_blocks:
+            feature_matrix = np.concatenate(feature_blocks, axis=1)
+        else:
+            feature_matrix = np.empty((len(records), 0), dtype=np.float32)
         
         if feature_matrix.shape[1] == 0:
             logger.warning("No features extracted, creating dummy feature")
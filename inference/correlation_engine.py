@@ -3,15 +3,88 @@ Correlation Engine - Layer 5
 Multi-stage attack and campaign detection
 """
 from typing import List, Dict, Any
-from collections import Counter, defaultdict
+from enum import IntEnum
 import logging
 
+import numpy as np
+import pandas as pd
+
 logger = logging.getLogger(__name__)
 
 
+class ThreatType(IntEnum):
+    """Integer ids for the threat labels produced by the detection layers"""
+    OTHER = 0
+    RECONNAISSANCE = 1
+    SENSITIVE_FILE_DISCLOSURE = 2
+    IDOR = 3
+    SQL_INJECTION = 4
+    XSS = 5
+    COMMAND_INJECTION = 6
+    PATH_TRAVERSAL = 7
+    SSTI = 8
+    RCE = 9
+    SSRF = 10
+    DATA_EXFILTRATION = 11
+    PRIVILEGE_ESCALATION = 12
+    OPEN_REDIRECT = 13
+    BRUTE_FORCE = 14
+    RATE_ABUSE = 15
+    ENUMERATION = 16
+    BURST_ACTIVITY = 17
+
+
+# String label <-> id mapping for the labels the engines emit
+_THREAT_IDS = {
+    'Other': ThreatType.OTHER,
+    'Reconnaissance': ThreatType.RECONNAISSANCE,
+    'Sensitive File Disclosure': ThreatType.SENSITIVE_FILE_DISCLOSURE,
+    'IDOR': ThreatType.IDOR,
+    'SQL Injection': ThreatType.SQL_INJECTION,
+    'XSS': ThreatType.XSS,
+    'Command Injection': ThreatType.COMMAND_INJECTION,
+    'Path Traversal': ThreatType.PATH_TRAVERSAL,
+    'SSTI': ThreatType.SSTI,
+    'RCE': ThreatType.RCE,
+    'SSRF': ThreatType.SSRF,
+    'Data Exfiltration': ThreatType.DATA_EXFILTRATION,
+    'Privilege Escalation': ThreatType.PRIVILEGE_ESCALATION,
+    'Open Redirect': ThreatType.OPEN_REDIRECT,
+    'Brute Force': ThreatType.BRUTE_FORCE,
+    'Rate Abuse': ThreatType.RATE_ABUSE,
+    'Enumeration': ThreatType.ENUMERATION,
+    'Burst Activity': ThreatType.BURST_ACTIVITY,
+}
+THREAT_NAME = {int(tid): name for name, tid in _THREAT_IDS.items()}
+
+
+# Threat-type categories as frozensets for O(1) membership tests
+_RECON_TYPES = frozenset({'Reconnaissance', 'Sensitive File Disclosure', 'IDOR'})
+_EXPLOIT_TYPES = frozenset({
+    'SQL Injection', 'XSS', 'Command Injection',
+    'Path Traversal', 'SSTI', 'RCE', 'SSRF'
+})
+_EXFIL_TYPES = frozenset({'Data Exfiltration', 'Privilege Escalation'})
+
+# Category bits, combined into a single lookup table so one dict hit per
+# threat type classifies it into recon/exploit/exfil
+_RECON_BIT, _EXPLOIT_BIT, _EXFIL_BIT = 1, 2, 4
+_ALL_STAGES = _RECON_BIT | _EXPLOIT_BIT | _EXFIL_BIT
+_CATEGORY_BITS = {
+    **{t: _RECON_BIT for t in _RECON_TYPES},
+    **{t: _EXPLOIT_BIT for t in _EXPLOIT_TYPES},
+    **{t: _EXFIL_BIT for t in _EXFIL_TYPES},
+}
+
+# Category bits indexed by threat id, for classifying whole id arrays at once
+_CATEGORY_BY_ID = np.zeros(len(ThreatType), dtype=np.uint8)
+for _name, _tid in _THREAT_IDS.items():
+    _CATEGORY_BY_ID[int(_tid)] = _CATEGORY_BITS.get(_name, 0)
+
+
 class CorrelationEngine:
     """Layer 5: Attack campaign and multi-stage threat correlation"""
-    
+
     def __init__(self):
         self.ip_activity = {}
     
@@ -25,82 +98,109 @@ class CorrelationEngine:
         Returns:
             Dictionary with correlation findings
         """
-        logger.info(f"Running correlation analysis on {len(results)} results")
-        
-        # Group threats by IP
-        ip_threats = defaultdict(list)
-        for result in results:
-            if result.get('severity') != 'normal':
-                ip = result.get('identifier', '')
-                if ip:
-                    ip_threats[ip].append({
-                        'threat_type': result.get('threat_type'),
-                        'timestamp': result.get('timestamp'),
-                        'severity': result.get('severity'),
-                        'confidence': result.get('confidence', 0.0),
-                        'uri': result.get('uri', '')
-                    })
-        
+        # Columnar layout: one pass pulls the three needed fields out of the
+        # result dicts, then the columnar path does the rest as array work
+        severities = np.array([r.get('severity', '') for r in results], dtype=object)
+        identifiers = np.array([r.get('identifier', '') for r in results], dtype=object)
+        type_names = np.array([r.get('threat_type', '') for r in results], dtype=object)
+        return self.analyze_attack_chain_columns(identifiers, severities, type_names)
+
+    def analyze_attack_chain_columns(
+        self,
+        identifiers: np.ndarray,
+        severities: np.ndarray,
+        type_names: np.ndarray
+    ) -> Dict[str, Any]:
+        """
+        Columnar variant of analyze_attack_chain
+
+        Callers that already hold the identifier/severity/threat-type
+        columns (the batch decision layer) use this directly and skip the
+        per-result dict probing entirely.
+        """
+        logger.info(f"Running correlation analysis on {len(identifiers)} results")
+
+        mask = (severities != 'normal') & (identifiers != '')
+        ids = identifiers[mask]
+        type_names = type_names[mask]
+        threat_ids_all = np.fromiter(
+            (_THREAT_IDS.get(t, ThreatType.OTHER) for t in type_names),
+            dtype=np.int16, count=len(type_names)
+        )
+
+        # Group by IP in first-occurrence order (matches the old dict-of-lists
+        # grouping); a stable argsort of the group codes yields contiguous
+        # row runs per IP
+        codes, unique_ips_arr = pd.factorize(ids)
+        group_sizes = np.bincount(codes, minlength=len(unique_ips_arr))
+        order = np.argsort(codes, kind='stable')
+        group_ends = np.cumsum(group_sizes)
+
         # Detect attack campaigns
         campaigns = []
         apt_campaigns = []
         automated_campaigns = []
-        
-        for ip, threats in ip_threats.items():
-            if len(threats) >= 3:
-                threat_types = [t['threat_type'] for t in threats]
-                
-                # Pattern 1: Advanced Persistent Threat (APT)
-                if self._has_attack_progression(threat_types):
-                    campaign = {
-                        'ip': ip,
-                        'type': 'Advanced Persistent Threat (APT)',
-                        'threat_count': len(threats),
-                        'severity': 'CRITICAL',
-                        'description': f'Multi-stage attack: {" → ".join(set(threat_types[:3]))}',
-                        'threat_types': list(set(threat_types))
-                    }
-                    campaigns.append(campaign)
-                    apt_campaigns.append(campaign)
-                    logger.warning(f"⚠️  APT detected from {ip}: {len(threats)} threats")
-                
-                # Pattern 2: Automated Attack Campaign
-                elif self._has_repeated_attacks(threat_types):
-                    campaign = {
-                        'ip': ip,
-                        'type': 'Automated Attack Campaign',
-                        'threat_count': len(threats),
-                        'severity': 'HIGH',
-                        'description': f'Repeated attacks: {len(threats)} threats from same source',
-                        'threat_types': list(set(threat_types))
-                    }
-                    campaigns.append(campaign)
-                    automated_campaigns.append(campaign)
-                    logger.warning(f"⚠️  Automated campaign from {ip}: {len(threats)} threats")
-                
-                # Pattern 3: Reconnaissance Campaign
-                elif self._has_reconnaissance_pattern(threat_types):
-                    campaign = {
-                        'ip': ip,
-                        'type': 'Reconnaissance Campaign',
-                        'threat_count': len(threats),
-                        'severity': 'MEDIUM',
-                        'description': f'Scanning activity: {len(threats)} reconnaissance attempts',
-                        'threat_types': list(set(threat_types))
-                    }
-                    campaigns.append(campaign)
-                    logger.info(f"Reconnaissance campaign from {ip}: {len(threats)} attempts")
-        
+
+        for g in np.flatnonzero(group_sizes >= 3):
+            rows = order[group_ends[g] - group_sizes[g]:group_ends[g]]
+            ip = unique_ips_arr[g]
+            threat_count = int(group_sizes[g])
+            threat_types = list(type_names[rows])
+            # Dedup once per IP (first-seen order) and reuse in every branch
+            unique_types = list(dict.fromkeys(threat_types))
+            kind = self._classify_campaign(threat_ids_all[rows])
+
+            # Pattern 1: Advanced Persistent Threat (APT)
+            if kind == 'apt':
+                campaign = {
+                    'ip': ip,
+                    'type': 'Advanced Persistent Threat (APT)',
+                    'threat_count': threat_count,
+                    'severity': 'CRITICAL',
+                    'description': f'Multi-stage attack: {" → ".join(dict.fromkeys(threat_types[:3]))}',
+                    'threat_types': unique_types
+                }
+                campaigns.append(campaign)
+                apt_campaigns.append(campaign)
+                logger.warning(f"⚠️  APT detected from {ip}: {threat_count} threats")
+
+            # Pattern 2: Automated Attack Campaign
+            elif kind == 'automated':
+                campaign = {
+                    'ip': ip,
+                    'type': 'Automated Attack Campaign',
+                    'threat_count': threat_count,
+                    'severity': 'HIGH',
+                    'description': f'Repeated attacks: {threat_count} threats from same source',
+                    'threat_types': unique_types
+                }
+                campaigns.append(campaign)
+                automated_campaigns.append(campaign)
+                logger.warning(f"⚠️  Automated campaign from {ip}: {threat_count} threats")
+
+            # Pattern 3: Reconnaissance Campaign
+            elif kind == 'reconnaissance':
+                campaign = {
+                    'ip': ip,
+                    'type': 'Reconnaissance Campaign',
+                    'threat_count': threat_count,
+                    'severity': 'MEDIUM',
+                    'description': f'Scanning activity: {threat_count} reconnaissance attempts',
+                    'threat_types': unique_types
+                }
+                campaigns.append(campaign)
+                logger.info(f"Reconnaissance campaign from {ip}: {threat_count} attempts")
+
         # Compute correlation statistics
-        total_threats = sum(len(threats) for threats in ip_threats.values())
-        unique_ips = len(ip_threats)
+        total_threats = int(len(ids))
+        unique_ips = len(unique_ips_arr)
         
         correlation_results = {
             'campaigns': campaigns,
             'total_campaigns': len(campaigns),
             'apt_campaigns': len(apt_campaigns),
             'automated_campaigns': len(automated_campaigns),
-            'affected_ips': list(ip_threats.keys()),
+            'affected_ips': list(unique_ips_arr),
             'total_threats_analyzed': total_threats,
             'unique_threat_sources': unique_ips,
             'campaign_details': {
@@ -114,34 +214,24 @@ class CorrelationEngine:
         
         return correlation_results
     
-    def _has_attack_progression(self, threat_types: List[str]) -> bool:
+    @staticmethod
+    def _classify_campaign(threat_ids: np.ndarray) -> str:
         """
-        Check if threats show APT progression pattern:
-        Reconnaissance → Exploitation → Exfiltration
+        Evaluate all campaign patterns with one derivation over the id array
+
+        Priority order matches the old three-predicate cascade:
+        APT (recon -> exploit -> exfil stages all present), then automated
+        (same type repeated >= 3 times), then reconnaissance (>= 70% of the
+        threats are recon-category). Returns '' when no pattern matches.
         """
-        recon_types = ['Reconnaissance', 'Sensitive File Disclosure', 'IDOR']
-        exploit_types = [
-            'SQL Injection', 'XSS', 'Command Injection',
-            'Path Traversal', 'SSTI', 'RCE', 'SSRF'
-        ]
-        exfil_types = ['Data Exfiltration', 'Privilege Escalation']
-        
-        has_recon = any(t in recon_types for t in threat_types)
-        has_exploit = any(t in exploit_types for t in threat_types)
-        has_exfil = any(t in exfil_types for t in threat_types)
-        
-        return has_recon and has_exploit and has_exfil
-    
-    def _has_repeated_attacks(self, threat_types: List[str]) -> bool:
-        """Check if same attack type repeated (automated tool)"""
-        counts = Counter(threat_types)
-        return any(count >= 3 for count in counts.values())
-    
-    def _has_reconnaissance_pattern(self, threat_types: List[str]) -> bool:
-        """Check if threats are primarily reconnaissance"""
-        recon_types = ['Reconnaissance', 'Sensitive File Disclosure', 'IDOR']
-        recon_count = sum(1 for t in threat_types if t in recon_types)
-        return recon_count >= len(threat_types) * 0.7
+        categories = _CATEGORY_BY_ID[threat_ids]
+        if int(np.bitwise_or.reduce(categories, initial=0)) == _ALL_STAGES:
+            return 'apt'
+        if int(np.bincount(threat_ids).max()) >= 3:
+            return 'automated'
+        if int((categories == _RECON_BIT).sum()) >= len(threat_ids) * 0.7:
+            return 'reconnaissance'
+        return ''
     
     def reset(self):
         """Reset correlation state"""
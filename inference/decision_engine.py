@@ -3,13 +3,61 @@ Decision Engine - Layer 4
 Signal aggregation and final risk scoring
 """
 import numpy as np
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from operator import attrgetter
 from typing import Dict, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
 import logging
 
 logger = logging.getLogger(__name__)
 
+# All HTTPRecord fields the decision engine needs, fetched in one C call
+# instead of eight getattr() lookups per record
+_RECORD_FIELDS = attrgetter(
+    'client_ip', 'timestamp', 'uri', 'status_code',
+    'method', 'duration', 'response_size', 'user_agent'
+)
+
+
+@lru_cache(maxsize=4096)
+def _explanation_prefix(threat_type, detection_layer, confidence,
+                        sig_confidence, beh_confidence, ml_score):
+    """
+    Build the record-independent part of an explanation string
+
+    Repetitive traffic collapses into a handful of (threat type, layer,
+    confidence) buckets, so the string formatting here runs once per bucket
+    instead of once per record. Flag-gated signal confidences are passed as
+    None when the corresponding layer did not fire.
+    """
+    parts = []
+
+    # Add threat type with confidence
+    if threat_type != "Other":
+        parts.append(f"{threat_type} detected (confidence: {confidence:.0%})")
+    else:
+        parts.append(f"Anomalous behavior detected (ML score: {ml_score:.3f})")
+
+    # Add detection layer
+    parts.append(f"via {detection_layer}")
+
+    # Add signal details
+    signals = []
+    if sig_confidence is not None:
+        signals.append(f"signature:{sig_confidence:.0%}")
+    if beh_confidence is not None:
+        signals.append(f"behavior:{beh_confidence:.0%}")
+    if ml_score > 0:
+        signals.append(f"ml:{ml_score:.2f}")
+
+    if signals:
+        parts.append(f"[{', '.join(signals)}]")
+
+    return "; ".join(parts)
+
 
 class AnomalySeverity(Enum):
     NORMAL = "normal"
@@ -19,27 +67,35 @@ class AnomalySeverity(Enum):
     CRITICAL = "critical"
 
 
-@dataclass
+# Severity thresholds and names laid out for array-based mapping: a right
+# bisection of the risk score over the cuts yields an index into the names.
+# The NumPy copy serves the batched path, the tuple the scalar path.
+_SEVERITY_CUTS = (0.40, 0.60, 0.75, 0.90)
+_SEVERITY_THRESHOLDS = np.array(_SEVERITY_CUTS, dtype=np.float32)
+_SEVERITY_NAMES = ('normal', 'low', 'medium', 'high', 'critical')
+
+
+@dataclass(slots=True)
 class UnifiedThreat:
     """Unified threat result from decision engine"""
     record_index: int
     identifier: str
     timestamp: str
-    
+
     # Final decision
     final_threat_type: str
     final_severity: str
     final_risk_score: float
-    
+
     # Signal breakdown
     signature_confidence: float
     behavior_confidence: float
     anomaly_score: float
-    
+
     # Detection details
     detection_layer: str
     explanation: str
-    
+
     # Record details
     uri: str
     status_code: int
@@ -48,7 +104,11 @@ class UnifiedThreat:
     response_size: int
     user_agent: str
     referer: str
-    
+
+    # Combined confidence, precomputed at decision time so to_dict never
+    # re-derives it
+    confidence: float = 0.0
+
     def to_dict(self):
         return {
             'record_index': self.record_index,
@@ -57,7 +117,7 @@ class UnifiedThreat:
             'threat_type': self.final_threat_type,
             'severity': self.final_severity,
             'score': self.final_risk_score,
-            'confidence': max(self.signature_confidence, self.behavior_confidence),
+            'confidence': self.confidence,
             'detection_layer': self.detection_layer,
             'explanation': self.explanation,
             'uri': self.uri,
@@ -71,6 +131,31 @@ class UnifiedThreat:
         }
 
 
+# Template for the common case: nothing flagged and the weighted risk can
+# not reach LOW. make_decision stamps the per-record fields onto a copy of
+# this instead of running the full scoring/explanation path.
+_NORMAL_THREAT = UnifiedThreat(
+    record_index=-1,
+    identifier='',
+    timestamp='',
+    final_threat_type='Other',
+    final_severity='normal',
+    final_risk_score=0.0,
+    signature_confidence=0.0,
+    behavior_confidence=0.0,
+    anomaly_score=0.0,
+    detection_layer='Layer 3: ML Anomaly Detection',
+    explanation='Normal request',
+    uri='',
+    status_code=0,
+    method='',
+    duration=0,
+    response_size=0,
+    user_agent='',
+    referer=''
+)
+
+
 class DecisionEngine:
     """Layer 4: Signal aggregation and risk scoring"""
     
@@ -93,9 +178,16 @@ class DecisionEngine:
         "SSTI",
         "RCE"
     ]
+    _CRITICAL_TYPE_SET = frozenset(CRITICAL_THREAT_TYPES)
     
     def __init__(self):
-        self.decision_count = 0
+        # Single mutable slot, batch-incremented once per make_decisions_batch
+        # call; approximate while a batch is in flight
+        self._decisions = array('l', [0])
+
+    @property
+    def decision_count(self) -> int:
+        return self._decisions[0]
     
     def make_decision(
         self,
@@ -120,16 +212,33 @@ class DecisionEngine:
         Returns:
             UnifiedThreat with final decision
         """
-        # Extract record details
-        identifier = getattr(record, 'client_ip', getattr(record, 'identifier', ''))
-        timestamp = getattr(record, 'timestamp', '')
-        uri = getattr(record, 'uri', '')
-        status_code = getattr(record, 'status_code', 0)
-        method = getattr(record, 'method', '')
-        duration = getattr(record, 'duration', 0)
-        response_size = getattr(record, 'response_size', 0)
-        user_agent = getattr(record, 'user_agent', '')
-        referer = getattr(record, 'raw_row', {}).get('referer', '')
+        # Fast path: nothing flagged means both signal confidences are zero,
+        # so the weighted risk is ml * ML_WEIGHT — if that cannot reach LOW
+        # the record is normal and the scoring/explanation work is skipped
+        if (not signature_result.signature_flag
+                and not behavior_result.behavior_flag
+                and ml_score_normalized * self.ML_WEIGHT < self.LOW_THRESHOLD):
+            return replace(
+                _NORMAL_THREAT,
+                record_index=record_index,
+                identifier=getattr(record, 'client_ip', None)
+                or getattr(record, 'identifier', ''),
+                timestamp=getattr(record, 'timestamp', ''),
+                final_risk_score=ml_score_normalized * self.ML_WEIGHT,
+                anomaly_score=ml_score
+            )
+
+        # Extract record details: one attrgetter call for HTTP records,
+        # generic records only expose identifier/timestamp
+        try:
+            (identifier, timestamp, uri, status_code,
+             method, duration, response_size, user_agent) = _RECORD_FIELDS(record)
+            referer = record.raw_row.get('referer', '')
+        except AttributeError:
+            identifier = getattr(record, 'identifier', '')
+            timestamp = getattr(record, 'timestamp', '')
+            uri = method = user_agent = referer = ''
+            status_code = duration = response_size = 0
         
         # Get confidence scores
         sig_confidence = signature_result.signature_confidence
@@ -185,7 +294,7 @@ class DecisionEngine:
         
         # Count non-normal detections
         if final_severity != AnomalySeverity.NORMAL.value:
-            self.decision_count += 1
+            self._decisions[0] += 1
         
         return UnifiedThreat(
             record_index=record_index,
@@ -205,21 +314,161 @@ class DecisionEngine:
             duration=duration,
             response_size=response_size,
             user_agent=user_agent,
-            referer=referer
+            referer=referer,
+            confidence=max(sig_confidence, behav_confidence)
         )
-    
+
+    def make_decisions_batch(
+        self,
+        records,
+        signature_results,
+        behavior_results,
+        ml_scores,
+        ml_scores_normalized,
+        min_severity: str = 'low'
+    ) -> list:
+        """
+        Aggregate signals for a whole batch of records at once
+
+        The weighted risk score and threshold-to-severity mapping run as
+        single NumPy passes over the confidence arrays; UnifiedThreat
+        objects (with their explanation strings) are only built for rows
+        at or above min_severity, which is the rare case. Rows below the
+        floor still count toward decision_count if they are non-normal.
+
+        Returns:
+            List of UnifiedThreat for records at or above min_severity,
+            in record order
+        """
+        n = len(records)
+        sig_conf = np.fromiter(
+            (s.signature_confidence for s in signature_results), np.float32, count=n
+        )
+        beh_conf = np.fromiter(
+            (b.behavior_confidence for b in behavior_results), np.float32, count=n
+        )
+        ml_norm = np.asarray(ml_scores_normalized, dtype=np.float32)
+
+        # Weighted risk score for every record in one vectorized expression
+        risk = (sig_conf * self.SIGNATURE_WEIGHT
+                + beh_conf * self.BEHAVIOR_WEIGHT
+                + ml_norm * self.ML_WEIGHT)
+
+        severity_idx = np.searchsorted(
+            _SEVERITY_THRESHOLDS, risk, side='right'
+        ).astype(np.int8)
+
+        # Any flagged record is at least LOW. Critical-type enforcement only
+        # applies to flagged records too (unflagged rows are typed "Other"),
+        # so after this step every enforceable row is already non-normal.
+        sig_flag = np.fromiter(
+            (s.signature_flag for s in signature_results), bool, count=n
+        )
+        beh_flag = np.fromiter(
+            (b.behavior_flag for b in behavior_results), bool, count=n
+        )
+        flagged = sig_flag | beh_flag
+        severity_idx[flagged & (severity_idx == 0)] = 1
+
+        # Critical signature types get floored at HIGH as a mask upgrade on
+        # the code array (all critical types are signature-detected, so the
+        # flag gate keeps "Other"-typed rows out)
+        critical = np.fromiter(
+            (s.signature_flag and s.threat_type in self._CRITICAL_TYPE_SET
+             for s in signature_results), bool, count=n
+        )
+        severity_idx[critical & (severity_idx < 3)] = 3
+
+        # Non-normal rows below the construction floor still count as
+        # decisions even though no result object is built for them
+        self._decisions[0] += int((severity_idx > 0).sum())
+
+        min_idx = _SEVERITY_NAMES.index(min_severity)
+        threats = []
+        for idx in np.flatnonzero(severity_idx >= max(min_idx, 1)):
+            record = records[idx]
+            signature_result = signature_results[idx]
+            behavior_result = behavior_results[idx]
+
+            if signature_result.signature_flag:
+                final_threat_type = signature_result.threat_type
+                detection_layer = "Layer 1: Signature Detection"
+                primary_confidence = float(sig_conf[idx])
+            elif behavior_result.behavior_flag:
+                final_threat_type = behavior_result.behavior_type
+                detection_layer = "Layer 2: Behavioral Detection"
+                primary_confidence = float(beh_conf[idx])
+            else:
+                final_threat_type = "Other"
+                detection_layer = "Layer 3: ML Anomaly Detection"
+                primary_confidence = float(ml_norm[idx])
+
+            final_severity = _SEVERITY_NAMES[severity_idx[idx]]
+
+            ml_score = float(ml_scores[idx])
+            explanation = self._generate_explanation(
+                final_threat_type,
+                final_severity,
+                detection_layer,
+                primary_confidence,
+                signature_result,
+                behavior_result,
+                ml_score,
+                record
+            )
+
+            try:
+                # RecordView from the pipeline: every field precomputed,
+                # including referer and the display identifier
+                identifier = record.identifier
+                referer = record.referer
+                timestamp = record.timestamp
+                uri = record.uri
+                status_code = record.status_code
+                method = record.method
+                duration = record.duration
+                response_size = record.response_size
+                user_agent = record.user_agent
+            except AttributeError:
+                try:
+                    (identifier, timestamp, uri, status_code,
+                     method, duration, response_size, user_agent) = _RECORD_FIELDS(record)
+                    referer = record.raw_row.get('referer', '')
+                except AttributeError:
+                    identifier = getattr(record, 'identifier', '')
+                    timestamp = getattr(record, 'timestamp', '')
+                    uri = method = user_agent = referer = ''
+                    status_code = duration = response_size = 0
+
+            threats.append(UnifiedThreat(
+                record_index=int(idx),
+                identifier=identifier,
+                timestamp=timestamp,
+                final_threat_type=final_threat_type,
+                final_severity=final_severity,
+                final_risk_score=float(risk[idx]),
+                signature_confidence=float(sig_conf[idx]),
+                behavior_confidence=float(beh_conf[idx]),
+                anomaly_score=ml_score,
+                detection_layer=detection_layer,
+                explanation=explanation,
+                uri=uri,
+                status_code=status_code,
+                method=method,
+                duration=duration,
+                response_size=response_size,
+                user_agent=user_agent,
+                referer=referer,
+                confidence=max(float(sig_conf[idx]), float(beh_conf[idx]))
+            ))
+
+        return threats
+
     def _map_risk_to_severity(self, risk_score: float) -> str:
         """Map risk score to severity level (original thresholds)"""
-        if risk_score >= self.CRITICAL_THRESHOLD:
-            return AnomalySeverity.CRITICAL.value
-        elif risk_score >= self.HIGH_THRESHOLD:
-            return AnomalySeverity.HIGH.value
-        elif risk_score >= self.MEDIUM_THRESHOLD:
-            return AnomalySeverity.MEDIUM.value
-        elif risk_score >= self.LOW_THRESHOLD:
-            return AnomalySeverity.LOW.value
-        else:
-            return AnomalySeverity.NORMAL.value
+        # Binary search over the module-level cuts (C-implemented bisect):
+        # same >= threshold semantics as the old if/elif chain
+        return _SEVERITY_NAMES[bisect_right(_SEVERITY_CUTS, risk_score)]
     
     def _generate_explanation(
         self,
@@ -235,44 +484,33 @@ class DecisionEngine:
         """Generate detailed explanation of detection"""
         if severity == AnomalySeverity.NORMAL.value:
             return "Normal request"
-        
-        parts = []
-        
-        # Add threat type with confidence
-        if threat_type != "Other":
-            parts.append(f"{threat_type} detected (confidence: {confidence:.0%})")
-        else:
-            parts.append(f"Anomalous behavior detected (ML score: {ml_score:.3f})")
-        
-        # Add detection layer
-        parts.append(f"via {detection_layer}")
-        
-        # Add signal details
-        signals = []
-        if signature_result.signature_flag:
-            signals.append(f"signature:{signature_result.signature_confidence:.0%}")
-        if behavior_result.behavior_flag:
-            signals.append(f"behavior:{behavior_result.behavior_confidence:.0%}")
-        if ml_score > 0:
-            signals.append(f"ml:{ml_score:.2f}")
-        
-        if signals:
-            parts.append(f"[{', '.join(signals)}]")
-        
+
+        # Record-independent prefix is memoized; only the HTTP-detail tail
+        # is built per record
+        explanation = _explanation_prefix(
+            threat_type,
+            detection_layer,
+            float(confidence),
+            float(signature_result.signature_confidence) if signature_result.signature_flag else None,
+            float(behavior_result.behavior_confidence) if behavior_result.behavior_flag else None,
+            float(ml_score)
+        )
+
         # Add HTTP details
         status_code = getattr(record, 'status_code', 0)
         response_size = getattr(record, 'response_size', 0)
         duration = getattr(record, 'duration', 0)
-        
-        if status_code >= 500:
-            parts.append(f"HTTP {status_code}")
-        elif status_code >= 400:
-            parts.append(f"HTTP {status_code}")
-        
+
+        tail = []
+        if status_code >= 400:
+            tail.append(f"HTTP {status_code}")
+
         if response_size > 500000:
-            parts.append(f"{response_size:,} bytes")
-        
+            tail.append(f"{response_size:,} bytes")
+
         if duration > 3000:
-            parts.append(f"{duration}ms")
-        
-        return "; ".join(parts)
+            tail.append(f"{duration}ms")
+
+        if tail:
+            return f"{explanation}; " + "; ".join(tail)
+        return explanation
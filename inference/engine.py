@@ -1,5 +1,9 @@
 # SOC-Grade Inference Engine - Enterprise Multi-Layer Detection Architecture
 import numpy as np
+import pandas as pd
+from collections import namedtuple
+from functools import cached_property
+from operator import attrgetter
 from typing import List, Dict, Any, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
@@ -18,6 +22,64 @@ from inference.llm_enrichment import LLMEnrichmentService
 logger = logging.getLogger(__name__)
 
 
+# Every record field the detection layers read, extracted exactly once at
+# the pipeline entry so no layer re-does getattr chains per record.
+# client_ip is None for non-HTTP records, which the behavioral and
+# signature layers use to skip them.
+RecordView = namedtuple('RecordView', [
+    'client_ip', 'identifier', 'timestamp', 'uri', 'status_code',
+    'method', 'duration', 'response_size', 'user_agent', 'referer'
+])
+
+# Severity labels coded for bincount-style tallies in the stats pass,
+# ordered to match AnomalySeverity
+_SEVERITY_CODES = {'normal': 0, 'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
+
+_HTTP_FIELDS = attrgetter(
+    'client_ip', 'timestamp', 'uri', 'status_code',
+    'method', 'duration', 'response_size', 'user_agent'
+)
+
+
+def _build_record_views(records) -> List[RecordView]:
+    """Extract each record's fields into a flat RecordView tuple"""
+    # Batches are type-homogeneous in practice (the parser emits one record
+    # type per file), so probe the first record and run a tight loop that
+    # assumes HTTP attributes; a mixed batch falls back to per-record checks
+    if records and isinstance(records[0], HTTPRecord):
+        try:
+            return [
+                RecordView(
+                    record.client_ip, record.client_ip, record.timestamp,
+                    record.uri, record.status_code, record.method,
+                    record.duration, record.response_size, record.user_agent,
+                    record.raw_row.get('referer', '')
+                )
+                for record in records
+            ]
+        except AttributeError:
+            pass
+
+    views = []
+    for record in records:
+        try:
+            (client_ip, timestamp, uri, status_code,
+             method, duration, response_size, user_agent) = _HTTP_FIELDS(record)
+            views.append(RecordView(
+                client_ip, client_ip, timestamp, uri, status_code,
+                method, duration, response_size, user_agent,
+                record.raw_row.get('referer', '')
+            ))
+        except AttributeError:
+            views.append(RecordView(
+                None,
+                getattr(record, 'identifier', ''),
+                getattr(record, 'timestamp', ''),
+                '', 0, '', 0, 0, '', ''
+            ))
+    return views
+
+
 # ============================================================================
 # DETECTION LAYER ENUM
 # ============================================================================
@@ -32,7 +94,7 @@ class DetectionLayer(Enum):
     LLM_ENRICHMENT = "Layer 6: LLM Intelligence (Optional)"
 
 
-@dataclass
+@dataclass(slots=True)
 class AnomalyResult:
     """Legacy result format for backward compatibility"""
     record_index: int
@@ -90,21 +152,42 @@ class AnomalyDetectionEngine:
     
     def __init__(self, enable_llm: bool = False, openai_api_key: str = None):
         self.feature_extractor = UniversalFeatureExtractor()
-        
-        # Initialize detection engines
-        self.signature_engine = SignatureEngine()
-        self.behavioral_engine = BehaviorEngine()
-        self.ml_engine = MLEngine()
-        self.decision_engine = DecisionEngine()
-        self.correlation_engine = CorrelationEngine()
-        
-        # Initialize LLM enrichment (optional)
-        self.llm_service = LLMEnrichmentService(
-            api_key=openai_api_key,
-            enabled=enable_llm
-        )
-        
+
+        # Detection engines are lazy cached_properties: constructing the
+        # pipeline costs nothing until a layer is first used, so importing
+        # the app or running a signature-only path never loads ML models
+        self._enable_llm = enable_llm
+        self._openai_api_key = openai_api_key
+
         logger.info(f"Initialized enterprise detection engine with {'6 layers (LLM enabled)' if enable_llm else '5 layers'}")
+
+    @cached_property
+    def signature_engine(self):
+        return SignatureEngine()
+
+    @cached_property
+    def behavioral_engine(self):
+        return BehaviorEngine()
+
+    @cached_property
+    def ml_engine(self):
+        # Loads the trained model artifacts, the expensive part of startup
+        return MLEngine()
+
+    @cached_property
+    def decision_engine(self):
+        return DecisionEngine()
+
+    @cached_property
+    def correlation_engine(self):
+        return CorrelationEngine()
+
+    @cached_property
+    def llm_service(self):
+        return LLMEnrichmentService(
+            api_key=self._openai_api_key,
+            enabled=self._enable_llm
+        )
     
     def retrain_model_on_data(self, model_type: str, training_data: np.ndarray):
         """Retrain ML models with new data"""
@@ -112,7 +195,7 @@ class AnomalyDetectionEngine:
         self.ml_engine.retrain_model(model_type, training_data)
 
     
-    def detect_anomalies(self, records: List[Union[HTTPRecord, GenericRecord]], features: np.ndarray, file_type: str, model_type: str, feature_info: Dict[str, Any]) -> Tuple[List[AnomalyResult], Dict[str, Any]]:
+    def detect_anomalies(self, records: List[Union[HTTPRecord, GenericRecord]], features: np.ndarray, file_type: str, model_type: str, feature_info: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
         """
         Enterprise multi-layer detection pipeline
         
@@ -139,99 +222,100 @@ class AnomalyDetectionEngine:
         # LAYERS 1, 2, 4: SIGNATURE + BEHAVIORAL + DECISION (PER RECORD)
         # ========================================================================
         logger.info("Layers 1, 2, 4: Running signature, behavioral, and decision engines...")
-        unified_results = []
-        
-        # Progress tracking for large datasets
+
+        # Extract record fields exactly once; all layers below consume the
+        # flat views instead of re-doing getattr chains on record objects
+        views = _build_record_views(records)
+
+        # Behavioral analysis runs vectorized over the whole batch up front;
+        # the per-record loop just indexes into its results
+        behavior_results = self.behavioral_engine.analyze_batch(views)
+
+        # LAYER 1: SIGNATURE DETECTION (ALWAYS RUNS FIRST)
+        # Columnar: the record fields go into flat columns once, the engine
+        # prefilters the URI and user-agent columns with vectorized string
+        # scans, and only prefilter hits pay for full classification
         total_records = len(records)
-        log_interval = max(1000, total_records // 10)  # Log every 10% or 1000 records
-        
-        for idx, (record, ml_score) in enumerate(zip(records, ml_scores)):
-            # Log progress for large datasets
-            if idx > 0 and idx % log_interval == 0:
-                progress_pct = (idx / total_records) * 100
-                logger.info(f"  Progress: {idx}/{total_records} records ({progress_pct:.1f}%)")
-            
-            # Normalize ML score to 0-1 range
-            ml_score_normalized = self.ml_engine.get_anomaly_score_normalized(ml_score, ml_scores)
-            
-            # LAYER 1: SIGNATURE DETECTION (ALWAYS RUNS FIRST)
-            if isinstance(record, HTTPRecord):
-                signature_result = self.signature_engine.detect(
-                    uri=record.uri,
-                    user_agent=record.user_agent,
-                    response_size=record.response_size,
-                    status_code=record.status_code
-                )
-            else:
-                # Generic records don't have signature detection
-                from inference.signature_engine import SignatureResult
-                signature_result = SignatureResult(
-                    signature_flag=False,
-                    threat_type="Other",
-                    signature_confidence=0.0,
-                    matched_patterns=[]
-                )
-            
-            # LAYER 2: BEHAVIORAL DETECTION (STATEFUL)
-            behavior_result = self.behavioral_engine.analyze_record(record, records)
-            
-            # LAYER 4: DECISION ENGINE (SIGNAL AGGREGATION)
-            unified_threat = self.decision_engine.make_decision(
-                record=record,
-                record_index=idx,
-                signature_result=signature_result,
-                behavior_result=behavior_result,
-                ml_score=ml_score,
-                ml_score_normalized=ml_score_normalized
-            )
-            
-            unified_results.append(unified_threat)
-        
+        uri_col = pd.Series([v.uri for v in views], dtype=object)
+        ua_col = pd.Series([v.user_agent for v in views], dtype=object)
+        size_col = np.fromiter(
+            (v.response_size for v in views), dtype=np.int64, count=total_records
+        )
+        http_mask = np.fromiter(
+            (v.client_ip is not None for v in views), dtype=bool, count=total_records
+        )
+        signature_results = self.signature_engine.detect_columns(
+            uri_col, ua_col, size_col, http_mask
+        )
+        # Tally once outside the pool so chunks never contend on the counter
+        self.signature_engine.detection_count += sum(
+            1 for s in signature_results if s.signature_flag
+        )
+
+        # Normalize ML scores to 0-1 range in one vectorized pass; the old
+        # per-score call recomputed the batch min/max every time (O(N²))
+        ml_scores_normalized = self.ml_engine.normalize_all(ml_scores)
+
+        # LAYER 4: DECISION ENGINE (SIGNAL AGGREGATION, vectorized over the
+        # batch). Only Critical/High/Medium threats are kept downstream, so
+        # the severity floor is pushed into the batch call and rows below it
+        # never construct a result object at all.
+        unified_results = self.decision_engine.make_decisions_batch(
+            records=views,
+            signature_results=signature_results,
+            behavior_results=behavior_results,
+            ml_scores=ml_scores,
+            ml_scores_normalized=ml_scores_normalized,
+            min_severity='medium'
+        )
+
         # Convert unified results to legacy AnomalyResult format for compatibility
-        # FILTER: Only include Critical, High, and Medium severity threats
-        legacy_results = []
-        for unified in unified_results:
-            # Only include threats that are MEDIUM or above
-            if unified.final_severity in ['critical', 'high', 'medium']:
-                legacy_result = AnomalyResult(
-                    record_index=unified.record_index,
-                    identifier=unified.identifier,
-                    timestamp=unified.timestamp,
-                    score=unified.final_risk_score,
-                    severity=unified.final_severity,
-                    model=model_type,
-                    threat_type=unified.final_threat_type,
-                    explanation=unified.explanation,
-                    confidence=max(unified.signature_confidence, unified.behavior_confidence),
-                    detection_layer=unified.detection_layer,
-                    uri=unified.uri,
-                    status_code=unified.status_code,
-                    method=unified.method,
-                    duration=unified.duration,
-                    response_size=unified.response_size,
-                    user_agent=unified.user_agent,
-                    referer=unified.referer
-                )
-                legacy_results.append(legacy_result)
+        legacy_results = [
+            AnomalyResult(
+                record_index=unified.record_index,
+                identifier=unified.identifier,
+                timestamp=unified.timestamp,
+                score=unified.final_risk_score,
+                severity=unified.final_severity,
+                model=model_type,
+                threat_type=unified.final_threat_type,
+                explanation=unified.explanation,
+                confidence=unified.confidence,
+                detection_layer=unified.detection_layer,
+                uri=unified.uri,
+                status_code=unified.status_code,
+                method=unified.method,
+                duration=unified.duration,
+                response_size=unified.response_size,
+                user_agent=unified.user_agent,
+                referer=unified.referer
+            )
+            for unified in unified_results
+        ]
         
         # ========================================================================
         # LAYER 5: CORRELATION ENGINE (CAMPAIGN DETECTION)
         # ========================================================================
         logger.info("Layer 5: Running correlation engine...")
-        # Only analyze filtered results (Critical/High/Medium) for campaigns
-        correlation_results = self.correlation_engine.analyze_attack_chain(
-            [r.to_dict() for r in legacy_results]
+        # Only analyze filtered results (Critical/High/Medium) for campaigns;
+        # the columns go straight to the engine without a to_dict round-trip
+        correlation_results = self.correlation_engine.analyze_attack_chain_columns(
+            np.array([r.identifier for r in legacy_results], dtype=object),
+            np.array([r.severity for r in legacy_results], dtype=object),
+            np.array([r.threat_type for r in legacy_results], dtype=object)
         )
         
         # ========================================================================
         # LAYER 6: LLM INTELLIGENCE (POST-DETECTION ENRICHMENT) - OPTIONAL
         # ========================================================================
+        # Materialize the result dicts exactly once; the LLM layer and the
+        # caller (which stores them in the session) share the same list
+        result_dicts = [r.to_dict() for r in legacy_results]
+
         llm_enrichment = {}
         if self.llm_service.enabled:
             logger.info("Layer 6: Running LLM enrichment analysis...")
-            llm_enrichment = self.llm_service.enrich_results(
-                [r.to_dict() for r in legacy_results]
-            )
+            llm_enrichment = self.llm_service.enrich_results(result_dicts)
         else:
             llm_enrichment = {
                 'enabled': False,
@@ -253,33 +337,39 @@ class AnomalyDetectionEngine:
         if correlation_results['total_campaigns'] > 0:
             logger.warning(f"⚠️  {correlation_results['total_campaigns']} attack campaigns detected!")
         
-        return legacy_results, stats
+        return result_dicts, stats
 
     
     @staticmethod
     def _compute_statistics(results: List[AnomalyResult], records: List[HTTPRecord], model_type: str, correlation_results: Dict[str, Any], llm_enrichment: Dict[str, Any]) -> Dict[str, Any]:
         """Compute detection statistics (only for Critical/High/Medium threats)"""
-        # Note: results are already filtered to only include critical/high/medium
-        severities = [r.severity for r in results]
-        threat_types = [r.threat_type for r in results]
-        threat_type_counts = {}
-        for tt in threat_types:
-            threat_type_counts[tt] = threat_type_counts.get(tt, 0) + 1
-        
-        # Detection layer statistics
-        layer_counts = {}
-        for r in results:
-            layer = r.detection_layer
-            layer_counts[layer] = layer_counts.get(layer, 0) + 1
-        
+        # Note: results are already filtered to only include critical/high/medium.
+        # Columns are pulled out of the result objects once; every tally below
+        # is then a single array pass instead of one generator sweep per bucket
+        n = len(results)
+        threat_types = np.array([r.threat_type for r in results], dtype=object)
+        layers = np.array([r.detection_layer for r in results], dtype=object)
+        scores = np.fromiter((r.score for r in results), dtype=np.float32, count=n)
+
+        # Severities come from a fixed five-label set, so they are coded to
+        # int8 and tallied with one bincount instead of string comparisons
+        sev_codes = np.fromiter(
+            (_SEVERITY_CODES[r.severity] for r in results), dtype=np.int8, count=n
+        )
+        sev_tally = np.bincount(sev_codes, minlength=5)
+        tt_values, tt_counts = np.unique(threat_types, return_counts=True)
+        threat_type_counts = {t: int(c) for t, c in zip(tt_values, tt_counts)}
+        layer_values, layer_tallies = np.unique(layers, return_counts=True)
+        layer_counts = {l: int(c) for l, c in zip(layer_values, layer_tallies)}
+
         stats = {
             'total_records': len(records),
-            'total_anomalies': len(results),  # Only critical/high/medium
-            'anomaly_percentage': 100.0 * len(results) / len(records) if len(records) > 0 else 0.0,
+            'total_anomalies': n,  # Only critical/high/medium
+            'anomaly_percentage': 100.0 * n / len(records) if len(records) > 0 else 0.0,
             'severity_distribution': {
-                'critical': sum(1 for s in severities if s == 'critical'),
-                'high': sum(1 for s in severities if s == 'high'),
-                'medium': sum(1 for s in severities if s == 'medium'),
+                'critical': int(sev_tally[_SEVERITY_CODES['critical']]),
+                'high': int(sev_tally[_SEVERITY_CODES['high']]),
+                'medium': int(sev_tally[_SEVERITY_CODES['medium']]),
                 'low': 0,  # Not tracked anymore
                 'normal': 0,  # Not tracked anymore
             },
@@ -287,8 +377,8 @@ class AnomalyDetectionEngine:
             'detection_layer_distribution': layer_counts,
             'correlation_findings': correlation_results,
             'llm_enrichment': llm_enrichment,  # NEW: LLM insights
-            'mean_score': float(np.mean([r.score for r in results])) if len(results) > 0 else 0.0,
-            'std_score': float(np.std([r.score for r in results])) if len(results) > 0 else 0.0,
+            'mean_score': float(scores.mean()) if n > 0 else 0.0,
+            'std_score': float(scores.std()) if n > 0 else 0.0,
             'model': model_type,
         }
         return stats
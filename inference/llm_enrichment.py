@@ -2,6 +2,9 @@
 LLM Intelligence Layer - Post-Detection Enrichment
 Analyzes high-severity threats for behavioral patterns and novel threat discovery
 """
+import asyncio
+import hashlib
+import heapq
 import os
 from typing import List, Dict, Any, Optional
 from collections import defaultdict
@@ -12,7 +15,7 @@ logger = logging.getLogger(__name__)
 
 # OpenAI SDK import (optional - only if API key is configured)
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
@@ -21,7 +24,10 @@ except ImportError:
 
 class ThreatCluster:
     """Represents a cluster of similar threats for LLM analysis"""
-    
+
+    __slots__ = ('ip', 'threat_types', 'threats', 'time_window', 'request_count',
+                 'avg_anomaly_score', 'severity_distribution', '_score_sum')
+
     def __init__(self, ip: str, threat_types: List[str], time_window: str):
         self.ip = ip
         self.threat_types = threat_types
@@ -30,37 +36,46 @@ class ThreatCluster:
         self.request_count = 0
         self.avg_anomaly_score = 0.0
         self.severity_distribution = defaultdict(int)
-    
+        self._score_sum = 0.0
+
     def add_threat(self, threat: Dict[str, Any]):
         """Add a threat to this cluster"""
         self.threats.append(threat)
         self.request_count += 1
         self.severity_distribution[threat['severity']] += 1
-    
+        self._score_sum += threat['score']
+
     def calculate_stats(self):
         """Calculate cluster statistics"""
-        if self.threats:
-            self.avg_anomaly_score = sum(t['score'] for t in self.threats) / len(self.threats)
-    
+        # Score sum is maintained by add_threat, so this is O(1)
+        if self.request_count:
+            self.avg_anomaly_score = self._score_sum / self.request_count
+
+    _SAMPLE_KEYS = ('uri', 'method', 'threat_type', 'severity', 'timestamp')
+
     def get_sample_logs(self, max_samples: int = 5) -> List[Dict[str, Any]]:
         """Get representative sample logs from cluster"""
-        # Get diverse samples (different threat types if possible)
+        # Get diverse samples: first occurrence of each threat type, then
+        # fill any remaining slots with the earliest leftover threats
         samples = []
         seen_types = set()
-        
-        for threat in self.threats:
-            if threat['threat_type'] not in seen_types or len(samples) < max_samples:
-                samples.append({
-                    'uri': threat['uri'],
-                    'method': threat['method'],
-                    'threat_type': threat['threat_type'],
-                    'severity': threat['severity'],
-                    'timestamp': threat['timestamp']
-                })
-                seen_types.add(threat['threat_type'])
-                if len(samples) >= max_samples:
-                    break
-        
+        taken = set()
+
+        for i, threat in enumerate(self.threats):
+            threat_type = threat['threat_type']
+            if threat_type not in seen_types:
+                seen_types.add(threat_type)
+                taken.add(i)
+                samples.append({k: threat[k] for k in self._SAMPLE_KEYS})
+                if len(samples) == max_samples:
+                    return samples
+
+        for i, threat in enumerate(self.threats):
+            if len(samples) == max_samples:
+                break
+            if i not in taken:
+                samples.append({k: threat[k] for k in self._SAMPLE_KEYS})
+
         return samples
     
     def to_dict(self) -> Dict[str, Any]:
@@ -100,12 +115,15 @@ class LLMEnrichmentService:
         self.client = None
         self.max_clusters_per_file = 10  # Cost control
         self.max_tokens = 500  # Cost control
-        
+        self.max_threats_for_llm = 2000  # Cost control: top-K most severe
+        self._analysis_cache = {}  # prompt sha1 -> analysis text
+        self._analysis_cache_size = 256
+
         if self.enabled and self.api_key:
             try:
                 # Azure OpenAI configuration using OpenAI client with custom base_url
                 endpoint = "https://rhea-mm1vfuyh-eastus2.cognitiveservices.azure.com/openai/v1/"
-                self.client = OpenAI(
+                self.client = AsyncOpenAI(
                     base_url=endpoint,
                     api_key=self.api_key
                 )
@@ -132,41 +150,42 @@ class LLMEnrichmentService:
         Returns:
             List of ThreatCluster objects
         """
-        clusters_by_ip = defaultdict(lambda: defaultdict(list))
-        
-        # Group by IP and threat type
+        # Single pass: accumulate threats, threat types and the severity
+        # counts that drive the sort per IP as we go, instead of a nested
+        # defaultdict plus a second totalling pass plus dict lookups on
+        # every sort comparison
+        agg = {}
         for threat in threats:
-            ip = threat['identifier']
-            threat_type = threat['threat_type']
-            clusters_by_ip[ip][threat_type].append(threat)
-        
-        # Create cluster objects
-        clusters = []
-        for ip, threat_groups in clusters_by_ip.items():
-            # Only create clusters for IPs with multiple threats
-            total_threats = sum(len(threats) for threats in threat_groups.values())
-            if total_threats >= 3:  # Minimum 3 threats to form a cluster
-                threat_types = list(threat_groups.keys())
+            entry = agg.setdefault(
+                threat['identifier'],
+                {'types': set(), 'threats': [], 'critical': 0, 'high': 0}
+            )
+            entry['types'].add(threat['threat_type'])
+            entry['threats'].append(threat)
+            severity = threat['severity']
+            if severity == 'critical':
+                entry['critical'] += 1
+            elif severity == 'high':
+                entry['high'] += 1
+
+        # Build clusters only for IPs with multiple threats, keyed by the
+        # precomputed (critical, high, count) rank (most severe first)
+        ranked = []
+        for ip, entry in agg.items():
+            if len(entry['threats']) >= 3:  # Minimum 3 threats to form a cluster
                 cluster = ThreatCluster(
                     ip=ip,
-                    threat_types=threat_types,
+                    threat_types=list(entry['types']),
                     time_window=f"{time_window_minutes} minutes"
                 )
-                
-                for threat_list in threat_groups.values():
-                    for threat in threat_list:
-                        cluster.add_threat(threat)
-                
-                clusters.append(cluster)
-        
-        # Sort by severity and threat count (most severe first)
-        clusters.sort(key=lambda c: (
-            c.severity_distribution.get('critical', 0),
-            c.severity_distribution.get('high', 0),
-            c.request_count
-        ), reverse=True)
-        
-        return clusters[:self.max_clusters_per_file]
+                for threat in entry['threats']:
+                    cluster.add_threat(threat)
+                ranked.append(
+                    ((entry['critical'], entry['high'], len(entry['threats'])), cluster)
+                )
+
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return [cluster for _, cluster in ranked[:self.max_clusters_per_file]]
     
     def prepare_llm_payload(self, cluster: ThreatCluster) -> str:
         """Prepare structured prompt for LLM analysis"""
@@ -201,36 +220,48 @@ Provide concise, actionable insights in 3-4 sentences."""
         
         return prompt
     
-    def analyze_with_llm(self, cluster: ThreatCluster) -> Optional[Dict[str, Any]]:
+    async def analyze_with_llm(self, cluster: ThreatCluster) -> Optional[Dict[str, Any]]:
         """
         Send cluster to LLM for behavioral analysis
-        
+
+        Identical prompts (same cluster fingerprint, e.g. across re-uploads
+        of the same file) reuse the cached completion instead of a new call.
+
         Returns:
             Dictionary with LLM insights or None if disabled/failed
         """
         if not self.enabled or not self.client:
             return None
-        
+
         try:
             prompt = self.prepare_llm_payload(cluster)
-            
+
             # Azure OpenAI deployment name - MUST match your Azure deployment
             deployment_name = "gpt-4o-mini"
-            
-            logger.info(f"Calling Azure OpenAI with deployment: {deployment_name}")
-            
-            response = self.client.chat.completions.create(
-                model=deployment_name,  # This is your Azure deployment name
-                messages=[
-                    {"role": "system", "content": "You are a cybersecurity threat intelligence analyst providing behavioral insights on detected threats."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=self.max_tokens,
-                temperature=0.3  # Lower temperature for more focused analysis
-            )
-            
-            analysis = response.choices[0].message.content
-            
+
+            prompt_key = hashlib.sha1(prompt.encode()).hexdigest()
+            analysis = self._analysis_cache.get(prompt_key)
+
+            if analysis is None:
+                logger.info(f"Calling Azure OpenAI with deployment: {deployment_name}")
+
+                response = await self.client.chat.completions.create(
+                    model=deployment_name,  # This is your Azure deployment name
+                    messages=[
+                        {"role": "system", "content": "You are a cybersecurity threat intelligence analyst providing behavioral insights on detected threats."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=self.max_tokens,
+                    temperature=0.3  # Lower temperature for more focused analysis
+                )
+
+                analysis = response.choices[0].message.content
+                if len(self._analysis_cache) >= self._analysis_cache_size:
+                    self._analysis_cache.pop(next(iter(self._analysis_cache)))
+                self._analysis_cache[prompt_key] = analysis
+            else:
+                logger.info(f"Reusing cached LLM analysis for cluster {cluster.ip}")
+
             return {
                 'cluster_ip': cluster.ip,
                 'threat_types': cluster.threat_types,
@@ -246,7 +277,22 @@ Provide concise, actionable insights in 3-4 sentences."""
             if hasattr(e, 'response'):
                 logger.error(f"Response: {e.response}")
             return None
-    
+
+    async def _analyze_clusters(self, clusters: List[ThreatCluster]) -> List[Dict[str, Any]]:
+        """Issue all cluster analyses concurrently and keep the successes"""
+        results = await asyncio.gather(
+            *(self.analyze_with_llm(cluster) for cluster in clusters),
+            return_exceptions=True
+        )
+        insights = []
+        for cluster, result in zip(clusters, results):
+            if isinstance(result, Exception):
+                logger.error(f"LLM analysis failed for cluster {cluster.ip}: {result}")
+            elif result:
+                insights.append(result)
+        return insights
+
+
     def detect_novel_patterns(self, threats: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Detect potential novel threat patterns
@@ -291,6 +337,18 @@ Provide concise, actionable insights in 3-4 sentences."""
         # Step 1: Filter high-severity threats
         high_severity_threats = self.filter_high_severity(results)
         logger.info(f"Filtered {len(high_severity_threats)} high-severity threats for LLM analysis")
+
+        # Cap huge result sets to the top-K most severe threats so the
+        # clustering pass (which holds every threat in memory) and the LLM
+        # call set stay bounded regardless of input size
+        if len(high_severity_threats) > self.max_threats_for_llm:
+            rank = {'critical': 2, 'high': 1, 'medium': 0}
+            high_severity_threats = heapq.nlargest(
+                self.max_threats_for_llm,
+                high_severity_threats,
+                key=lambda t: (rank.get(t['severity'], 0), t['score'])
+            )
+            logger.info(f"Capped LLM analysis set to top {self.max_threats_for_llm} threats")
         
         if len(high_severity_threats) == 0:
             return {
@@ -304,12 +362,9 @@ Provide concise, actionable insights in 3-4 sentences."""
         clusters = self.cluster_threats(high_severity_threats)
         logger.info(f"Created {len(clusters)} threat clusters")
         
-        # Step 3: Analyze clusters with LLM
-        llm_insights = []
-        for cluster in clusters:
-            insight = self.analyze_with_llm(cluster)
-            if insight:
-                llm_insights.append(insight)
+        # Step 3: Analyze clusters with LLM — all prompts in flight at
+        # once, so wall time is one round trip instead of one per cluster
+        llm_insights = asyncio.run(self._analyze_clusters(clusters))
         
         # Step 4: Detect novel patterns
         novel_patterns = self.detect_novel_patterns(high_severity_threats)
@@ -11,7 +11,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class MLResult:
     """Result from ML anomaly detection"""
     anomaly_score: float
@@ -39,34 +39,89 @@ class MLEngine:
             Tuple of (anomaly_scores, metadata)
         """
         logger.info(f"Running ML anomaly detection with {model_type} on {features.shape[0]} records")
-        
+
         if model_type == 'isolation_forest':
             scores, is_anomaly = self.isolation_forest.predict(features)
+            scores = np.asarray(scores, dtype=np.float32)
+            mean, std = self._score_stats(scores)
+            anomaly_count = int(np.sum(is_anomaly))
             metadata = {
                 'model': 'isolation_forest',
-                'anomaly_count': int(np.sum(is_anomaly)),
-                'mean_score': float(np.mean(scores)),
-                'std_score': float(np.std(scores))
+                'anomaly_count': anomaly_count,
+                'mean_score': mean,
+                'std_score': std
             }
-            self.detection_count = int(np.sum(is_anomaly))
+            self.detection_count = anomaly_count
             return scores, metadata
-        
+
         elif model_type == 'autoencoder':
             scores, ae_metadata = self.autoencoder.predict(features)
+            scores = np.asarray(scores, dtype=np.float32)
+            mean, std = self._score_stats(scores)
             metadata = {
                 'model': 'autoencoder',
-                'mean_score': float(np.mean(scores)),
-                'std_score': float(np.std(scores)),
+                'mean_score': mean,
+                'std_score': std,
                 **ae_metadata
             }
-            # Count anomalies using threshold
-            threshold = np.percentile(scores, 80)
+            # Count anomalies above the 80th-percentile threshold; the
+            # order statistic comes from an O(N) partial partition with
+            # the same linear interpolation np.percentile would apply,
+            # instead of a full O(N log N) sort
+            threshold = self._percentile(scores, 0.8)
             self.detection_count = int(np.sum(scores >= threshold))
             return scores, metadata
-        
+
         else:
             raise ValueError(f"Unknown model type: {model_type}")
+
+    @staticmethod
+    def _score_stats(scores: np.ndarray) -> Tuple[float, float]:
+        """Mean and std of a score array from one accumulation pass"""
+        n = scores.size
+        if n == 0:
+            return 0.0, 0.0
+        total = float(scores.sum())
+        total_sq = float(np.dot(scores, scores))
+        mean = total / n
+        variance = max(total_sq / n - mean * mean, 0.0)
+        return mean, float(np.sqrt(variance))
+
+    @staticmethod
+    def _percentile(scores: np.ndarray, q: float) -> float:
+        """Linear-interpolated percentile via introselect instead of a sort"""
+        n = scores.size
+        position = q * (n - 1)
+        k = int(position)
+        if k + 1 >= n:
+            return float(np.partition(scores, k)[k])
+        part = np.partition(scores, (k, k + 1))
+        frac = position - k
+        return float(part[k] + frac * (part[k + 1] - part[k]))
     
+    def normalize_all(self, scores: np.ndarray) -> np.ndarray:
+        """
+        Min-max normalize a whole score array to 0-1 in one pass
+
+        The min/max are computed once for the batch instead of once per
+        score, so normalizing N scores is O(N) rather than O(N²).
+
+        Args:
+            scores: Raw anomaly scores
+
+        Returns:
+            Array of normalized scores between 0 and 1
+        """
+        scores = np.asarray(scores, dtype=np.float32)
+        min_score = scores.min()
+        max_score = scores.max()
+
+        if max_score == min_score:
+            return np.full(len(scores), 0.5, dtype=np.float32)
+
+        normalized = (scores - min_score) / (max_score - min_score)
+        return np.clip(normalized, 0.0, 1.0)
+
     def get_anomaly_score_normalized(self, score: float, all_scores: np.ndarray) -> float:
         """
         Normalize anomaly score to 0-1 range
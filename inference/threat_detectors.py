@@ -3,10 +3,15 @@ Rule-Based Threat Detectors
 Pure Python functions for threat classification (NO ML)
 """
 import re
+from collections import Counter
+from functools import lru_cache
 from urllib.parse import unquote
 from typing import Optional
+import numpy as np
 import pandas as pd
 
+from inference.correlation_engine import THREAT_NAME
+
 
 # ============================================================================
 # THREAT DETECTION PATTERNS
@@ -24,29 +29,31 @@ XSS_PATTERNS = [
 ]
 
 # SQL Injection Patterns
+# Minimal cover: patterns whose matches are a strict subset of another
+# pattern in the list (e.g. "union\s+select" vs "union.*select",
+# "' or 1=1" vs "' or ", ";--" vs "--") are dropped — same strings
+# match, smaller compiled alternation, no double-reporting
 SQLI_PATTERNS = [
-    r"sqlmap", r"union\s+select", r"union.*select",
-    r"' or '1'='1", r"' or ", r"--", r";--",
+    r"sqlmap", r"union.*select",
+    r"' or ", r"--",
     r"drop\s+table", r"insert\s+into",
-    r"select\s+\*\s+from", r"select.*from",
-    r"1=1", r"' or 1=1", r"admin'--", r"' OR '1"
+    r"select.*from", r"1=1"
 ]
 
 # Path Traversal / LFI Patterns
 TRAVERSAL_PATTERNS = [
-    r"\.\./", r"\.\.\\", r"\.\.",
-    r"%2e%2e", r"%252e%252e", r"%2e",
+    r"\.\.", r"%252e%252e", r"%2e",
     r"/etc/passwd", r"/etc/shadow",
     r"/proc/self", r"/windows/system32",
     r"password\.properties", r"license\.txt",
     r"CFIDE", r"administrator",
-    r"\.\.\/\.\.\/", r"file:///"
+    r"file:///"
 ]
 
 # Command Injection / RCE Patterns
 CMD_PATTERNS = [
     r"rm\s+-rf", r";\s*cat\s+/etc/", r"cat /etc",
-    r"&&\s*whoami", r"\|\s*bash", r"whoami",
+    r"\|\s*bash", r"whoami",
     r";\s*wget", r"`cat", r"; ls", r"&& ls",
     r"cmd=", r"exec\(", r"system\(", r"shell_exec",
     r"\$\{.*\}", r"bash -c"
@@ -62,6 +69,14 @@ SSRF_PATTERNS = [
     r"redirect.*http://"
 ]
 
+# The exact-host subset of the SSRF rules, tested as plain substrings on
+# the scalar fast path (a literal 'in' is a tight C scan; the regex VM
+# only runs for the three genuinely regex SSRF rules below)
+SSRF_LITERALS = (
+    "169.254.169.254", "metadata.google.internal",
+    "localhost", "127.0.0.1", "0.0.0.0", "::1"
+)
+
 # IDOR Patterns
 IDOR_PATTERNS = [
     r"/api/user/\d{5,}",  # Large user IDs
@@ -123,86 +138,95 @@ BAD_AGENTS = [
 # THREAT DETECTORS
 # ============================================================================
 
-# ============================================================================
-# THREAT DETECTORS
-# ============================================================================
+# Each pattern list compiles into one alternation at import, so a detector
+# call is a single C-level scan of the URI instead of one re.search per
+# pattern. Flags mirror the original per-pattern calls: XSS searched with
+# IGNORECASE, the other regex lists case-sensitively on the lowered text,
+# and the plain-substring lists (priv-esc, exfil, bad agents) join as
+# escaped literals
+_XSS_RE = re.compile('|'.join(f'(?:{p})' for p in XSS_PATTERNS), re.IGNORECASE)
+_SQLI_RE = re.compile('|'.join(f'(?:{p})' for p in SQLI_PATTERNS))
+_TRAVERSAL_RE = re.compile('|'.join(f'(?:{p})' for p in TRAVERSAL_PATTERNS))
+_CMD_RE = re.compile('|'.join(f'(?:{p})' for p in CMD_PATTERNS))
+_SSRF_RE = re.compile('|'.join(f'(?:{p})' for p in SSRF_PATTERNS))
+_SSRF_REGEX_RE = re.compile(r"url=http://|fetch\?url=|redirect.*http://")
+_IDOR_RE = re.compile('|'.join(f'(?:{p})' for p in IDOR_PATTERNS))
+_SSTI_RE = re.compile('|'.join(f'(?:{p})' for p in SSTI_PATTERNS))
+_OPEN_REDIRECT_RE = re.compile('|'.join(f'(?:{p})' for p in OPEN_REDIRECT_PATTERNS))
+_SENSITIVE_FILE_RE = re.compile('|'.join(f'(?:{p})' for p in SENSITIVE_FILE_PATTERNS))
+_PRIV_ESC_RE = re.compile('|'.join(map(re.escape, PRIV_ESC_PATTERNS)))
+_EXFIL_RE = re.compile('|'.join(map(re.escape, EXFIL_PATTERNS)))
+_BAD_AGENT_RE = re.compile('|'.join(map(re.escape, BAD_AGENTS)))
+
 
 def detect_xss(uri: str) -> bool:
     """Detect XSS attempts"""
     if not uri:
         return False
-    uri = uri.lower()
-    return any(re.search(p, uri, re.IGNORECASE) for p in XSS_PATTERNS)
+    return _XSS_RE.search(uri.lower()) is not None
 
 
 def detect_sql_injection(uri: str) -> bool:
     """Detect SQL injection attempts"""
     if not uri:
         return False
-    uri = uri.lower()
-    return any(re.search(p, uri) for p in SQLI_PATTERNS)
+    return _SQLI_RE.search(uri.lower()) is not None
 
 
 def detect_path_traversal(uri: str) -> bool:
     """Detect path traversal / LFI attempts"""
     if not uri:
         return False
-    decoded = unquote(uri.lower())
-    return any(re.search(p, decoded) for p in TRAVERSAL_PATTERNS)
+    return _TRAVERSAL_RE.search(unquote(uri.lower())) is not None
 
 
 def detect_command_injection(uri: str) -> bool:
     """Detect command injection / RCE attempts"""
     if not uri:
         return False
-    uri = uri.lower()
-    return any(re.search(p, uri) for p in CMD_PATTERNS)
+    return _CMD_RE.search(uri.lower()) is not None
 
 
 def detect_ssrf(uri: str) -> bool:
     """Detect SSRF attempts"""
     if not uri:
         return False
-    uri = uri.lower()
-    return any(re.search(p, uri) for p in SSRF_PATTERNS)
+    return _SSRF_RE.search(uri.lower()) is not None
 
 
 def detect_idor(uri: str) -> bool:
     """Detect IDOR attempts"""
     if not uri:
         return False
-    return any(re.search(p, uri) for p in IDOR_PATTERNS)
+    return _IDOR_RE.search(uri) is not None
 
 
 def detect_ssti(uri: str) -> bool:
     """Detect SSTI attempts"""
     if not uri:
         return False
-    return any(re.search(p, uri) for p in SSTI_PATTERNS)
+    return _SSTI_RE.search(uri) is not None
 
 
 def detect_open_redirect(uri: str) -> bool:
     """Detect open redirect attempts"""
     if not uri:
         return False
-    uri = uri.lower()
-    return any(re.search(p, uri) for p in OPEN_REDIRECT_PATTERNS)
+    return _OPEN_REDIRECT_RE.search(uri.lower()) is not None
 
 
 def detect_sensitive_file_access(uri: str) -> bool:
     """Detect sensitive file disclosure attempts"""
     if not uri:
         return False
-    uri = uri.lower()
-    return any(re.search(p, uri) for p in SENSITIVE_FILE_PATTERNS)
+    return _SENSITIVE_FILE_RE.search(uri.lower()) is not None
 
 
 def detect_privilege_escalation(uri: str) -> bool:
     """Detect privilege escalation attempts"""
     if not uri:
         return False
-    uri = uri.lower()
-    return any(p in uri for p in PRIV_ESC_PATTERNS)
+    return _PRIV_ESC_RE.search(uri.lower()) is not None
 
 
 def detect_data_exfiltration(uri: str, response_size: int) -> bool:
@@ -210,91 +234,246 @@ def detect_data_exfiltration(uri: str, response_size: int) -> bool:
     if not uri:
         return False
     return (
-        any(p in uri.lower() for p in EXFIL_PATTERNS) or
+        _EXFIL_RE.search(uri.lower()) is not None or
         response_size > 1_000_000
     )
 
 
+# One-batch memo for brute-force failure counts: callers pass the same
+# records list for every request in a batch, so the auth-failure tally is
+# built once per list instead of rescanning all records per call
+_failure_counts_key = None
+_failure_counts = None
+
+
+def _auth_failure_counts(records) -> dict:
+    """Per-IP count of 401/403 responses, cached per records list"""
+    global _failure_counts_key, _failure_counts
+    key = (id(records), len(records))
+    if key != _failure_counts_key:
+        counts = {}
+        for r in records:
+            if getattr(r, 'status_code', None) in (401, 403):
+                ip = getattr(r, 'client_ip', None)
+                if ip is not None:
+                    counts[ip] = counts.get(ip, 0) + 1
+        _failure_counts_key = key
+        _failure_counts = counts
+    return _failure_counts
+
+
 def detect_bruteforce(records, current_ip: str, window: int = 60, threshold: int = 5) -> bool:
     """Detect brute force attempts (behavioral)"""
     if not records or not current_ip:
         return False
-    
-    failures = sum(
-        1 for r in records
-        if hasattr(r, 'client_ip') and r.client_ip == current_ip
-        and hasattr(r, 'status_code') and r.status_code in [401, 403]
-    )
-    return failures >= threshold
+    return _auth_failure_counts(records).get(current_ip, 0) >= threshold
 
 
 def detect_suspicious_agent(user_agent: str) -> bool:
     """Detect suspicious user agents"""
     if not user_agent:
         return False
-    ua = user_agent.lower()
-    return any(a in ua for a in BAD_AGENTS)
+    return _BAD_AGENT_RE.search(user_agent.lower()) is not None
 
 
 # ============================================================================
 # THREAT CLASSIFIER WITH CONFIDENCE
 # ============================================================================
 
+@lru_cache(maxsize=4096)
+def _classify_request(uri: str, user_agent: str, oversized: bool) -> tuple:
+    """
+    Stateless classification cascade over one request
+
+    Lowercases and percent-decodes the URI exactly once and runs the
+    compiled category alternations directly, in the same priority order
+    as the public detect_* helpers. Cached because real traffic repeats
+    URIs heavily; the brute-force rule is stateful and handled by the
+    caller.
+    """
+    # The shortest URI pattern is two characters ('--'), so URIs below
+    # that length can only trip the oversized-response exfiltration rule
+    if uri and len(uri) < 2:
+        if oversized:
+            return "Data Exfiltration", 0.78
+        uri = ""
+
+    if uri:
+        uri_lower = uri.lower()
+        decoded = unquote(uri_lower)
+        ua_lower = user_agent.lower()
+
+        # Priority 1: Code Execution Threats (Most Critical) - High Confidence
+        if _CMD_RE.search(uri_lower):
+            return "Command Injection", 0.95
+
+        if _SSTI_RE.search(uri):
+            return "SSTI", 0.95
+
+        # Priority 2: Injection Attacks - High Confidence
+        if _SQLI_RE.search(uri_lower):
+            return "SQL Injection", 0.90
+
+        if _XSS_RE.search(uri_lower):
+            return "XSS", 0.90
+
+        # Priority 3: File Access Attacks - High Confidence
+        if _TRAVERSAL_RE.search(decoded):
+            return "Path Traversal", 0.92
+
+        if _SENSITIVE_FILE_RE.search(uri_lower):
+            return "Sensitive File Disclosure", 0.88
+
+        # Priority 4: Network Attacks - Medium-High Confidence
+        if (any(lit in uri_lower for lit in SSRF_LITERALS)
+                or _SSRF_REGEX_RE.search(uri_lower)):
+            return "SSRF", 0.85
+
+        # Priority 5: Authorization Attacks - Medium Confidence
+        if _IDOR_RE.search(uri):
+            return "IDOR", 0.75
+
+        if _PRIV_ESC_RE.search(uri_lower):
+            return "Privilege Escalation", 0.80
+
+        # Priority 6: Data Attacks - Medium Confidence
+        if _EXFIL_RE.search(uri_lower) or oversized:
+            return "Data Exfiltration", 0.78
+
+        # Priority 7: Redirect Attacks - Medium Confidence
+        if _OPEN_REDIRECT_RE.search(uri_lower):
+            return "Open Redirect", 0.82
+    else:
+        ua_lower = user_agent.lower()
+
+    # Priority 8: Behavioral Attacks - Lower Confidence (brute force is
+    # evaluated by the caller, above the reconnaissance rule)
+    if ua_lower and _BAD_AGENT_RE.search(ua_lower):
+        return "Reconnaissance", 0.65
+
+    return "Other", 0.0
+
+
 def classify_threat_with_confidence(uri: str, user_agent: str, response_size: int, status_code: int, records=None, client_ip: str = None) -> tuple:
     """
     Classify threat type using deterministic rules with confidence score
-    
+
     Returns:
         (threat_type: str, confidence: float)
     """
-    # Priority 1: Code Execution Threats (Most Critical) - High Confidence
-    if detect_command_injection(uri):
-        return "Command Injection", 0.95
-    
-    if detect_ssti(uri):
-        return "SSTI", 0.95
-    
-    # Priority 2: Injection Attacks - High Confidence
-    if detect_sql_injection(uri):
-        return "SQL Injection", 0.90
-    
-    if detect_xss(uri):
-        return "XSS", 0.90
-    
-    # Priority 3: File Access Attacks - High Confidence
-    if detect_path_traversal(uri):
-        return "Path Traversal", 0.92
-    
-    if detect_sensitive_file_access(uri):
-        return "Sensitive File Disclosure", 0.88
-    
-    # Priority 4: Network Attacks - Medium-High Confidence
-    if detect_ssrf(uri):
-        return "SSRF", 0.85
-    
-    # Priority 5: Authorization Attacks - Medium Confidence
-    if detect_idor(uri):
-        return "IDOR", 0.75
-    
-    if detect_privilege_escalation(uri):
-        return "Privilege Escalation", 0.80
-    
-    # Priority 6: Data Attacks - Medium Confidence
-    if detect_data_exfiltration(uri, response_size):
-        return "Data Exfiltration", 0.78
-    
-    # Priority 7: Redirect Attacks - Medium Confidence
-    if detect_open_redirect(uri):
-        return "Open Redirect", 0.82
-    
-    # Priority 8: Behavioral Attacks - Lower Confidence
-    if records and client_ip and detect_bruteforce(records, client_ip):
-        return "Brute Force", 0.70
-    
-    if detect_suspicious_agent(user_agent):
-        return "Reconnaissance", 0.65
-    
-    return "Other", 0.0
+    threat_type, confidence = _classify_request(
+        uri or '', user_agent or '', bool(uri) and response_size > 1_000_000
+    )
+
+    # Brute force outranks only reconnaissance and unclassified traffic
+    if threat_type in ('Other', 'Reconnaissance'):
+        if records and client_ip and detect_bruteforce(records, client_ip):
+            return "Brute Force", 0.70
+
+    return threat_type, confidence
+
+
+# Integer codes for threat labels, shared with the correlation layer
+THREAT_CODES = {name: tid for tid, name in THREAT_NAME.items()}
+
+# Master prefilters for the batch classifier: one alternation over every
+# URI rule and one over the bad-agent substrings. A row that misses both
+# (and is not an oversized response) classifies as "Other" without ever
+# entering the per-rule cascade. The '%' alternative routes
+# percent-encoded URIs through the full cascade, since those are the only
+# strings unquote() can change before the traversal rules see them.
+_URI_PREFILTER = re.compile(
+    '%|' + '|'.join(
+        f'(?:{p})' for group in (
+            CMD_PATTERNS, SSTI_PATTERNS, SQLI_PATTERNS, XSS_PATTERNS,
+            TRAVERSAL_PATTERNS, SENSITIVE_FILE_PATTERNS, SSRF_PATTERNS,
+            IDOR_PATTERNS, PRIV_ESC_PATTERNS, EXFIL_PATTERNS,
+            OPEN_REDIRECT_PATTERNS
+        ) for p in group
+    ), re.IGNORECASE
+)
+_UA_PREFILTER = re.compile('|'.join(map(re.escape, BAD_AGENTS)), re.IGNORECASE)
+
+
+# Per-category rules for the vectorized classifier, in reverse priority
+# order so later (higher-priority) assignments overwrite earlier ones.
+# Each entry: (threat type, confidence, compiled pattern, which text the
+# scalar detector scans: lowered URI, decoded lowered URI, raw URI or
+# lowered user agent)
+_BATCH_RULES = (
+    ('Reconnaissance', 0.65, _BAD_AGENT_RE, 'agent'),
+    ('Open Redirect', 0.82, _OPEN_REDIRECT_RE, 'lower'),
+    ('Data Exfiltration', 0.78, _EXFIL_RE, 'lower'),
+    ('Privilege Escalation', 0.80, _PRIV_ESC_RE, 'lower'),
+    ('IDOR', 0.75, _IDOR_RE, 'raw'),
+    ('SSRF', 0.85, _SSRF_RE, 'lower'),
+    ('Sensitive File Disclosure', 0.88, _SENSITIVE_FILE_RE, 'lower'),
+    ('Path Traversal', 0.92, _TRAVERSAL_RE, 'decoded'),
+    ('XSS', 0.90, _XSS_RE, 'lower'),
+    ('SQL Injection', 0.90, _SQLI_RE, 'lower'),
+    ('SSTI', 0.95, _SSTI_RE, 'raw'),
+    ('Command Injection', 0.95, _CMD_RE, 'lower'),
+)
+
+
+def classify_threats_batch(uris, user_agents, response_sizes) -> tuple:
+    """
+    Classify a whole batch of requests at once
+
+    The URI and user-agent columns are prefiltered with two vectorized
+    scans; rows that hit a prefilter (or exceed the exfiltration size
+    threshold) are then classified with one vectorized scan per category,
+    assigned in reverse priority order so the highest-priority category
+    wins — no per-row Python cascade. Behavioral brute-force
+    classification is per-IP state and is not evaluated here.
+
+    Args:
+        uris: Sequence of request URIs
+        user_agents: Sequence of user-agent strings
+        response_sizes: Sequence of response sizes in bytes
+
+    Returns:
+        (threat_codes: np.ndarray[int8], confidences: np.ndarray[float32])
+        with codes from THREAT_CODES ("Other" = 0)
+    """
+    n = len(uris)
+    codes = np.zeros(n, dtype=np.int8)
+    confidences = np.zeros(n, dtype=np.float32)
+
+    uri_col = pd.Series(uris, dtype=object)
+    ua_col = pd.Series(user_agents, dtype=object)
+    sizes = np.asarray(response_sizes)
+    maybe = (
+        uri_col.str.contains(_URI_PREFILTER, regex=True, na=False).to_numpy(dtype=bool)
+        | ua_col.str.contains(_UA_PREFILTER, regex=True, na=False).to_numpy(dtype=bool)
+        | (sizes > 1_000_000)
+    )
+    candidates = np.flatnonzero(maybe)
+    if len(candidates) == 0:
+        return codes, confidences
+
+    raw = uri_col.iloc[candidates]
+    lower = raw.str.lower()
+    decoded = pd.Series([unquote(u) for u in lower], index=lower.index, dtype=object)
+    agent = ua_col.iloc[candidates].str.lower()
+    nonempty = raw.str.len().fillna(0).to_numpy() > 0
+
+    columns = {'raw': raw, 'lower': lower, 'decoded': decoded, 'agent': agent}
+    sub_codes = np.zeros(len(candidates), dtype=np.int8)
+    sub_conf = np.zeros(len(candidates), dtype=np.float32)
+    for threat_type, confidence, pattern, column in _BATCH_RULES:
+        hit = columns[column].str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+        if column != 'agent':
+            # Scalar detectors bail out on empty URIs before matching
+            hit = hit & nonempty
+        if threat_type == 'Data Exfiltration':
+            hit = hit | (nonempty & (sizes[candidates] > 1_000_000))
+        sub_codes[hit] = THREAT_CODES[threat_type]
+        sub_conf[hit] = confidence
+
+    codes[candidates] = sub_codes
+    confidences[candidates] = sub_conf
+    return codes, confidences
 
 
 def classify_threat(uri: str, user_agent: str, response_size: int, status_code: int, records=None, client_ip: str = None) -> str:
@@ -325,65 +504,60 @@ class ThreatCorrelationEngine:
         Returns:
             Dictionary with correlation findings
         """
-        # Group threats by IP
-        ip_threats = {}
-        for result in results:
-            if result.get('severity') != 'normal':
-                ip = result.get('identifier', '')
-                if ip not in ip_threats:
-                    ip_threats[ip] = []
-                ip_threats[ip].append({
-                    'threat_type': result.get('threat_type'),
-                    'timestamp': result.get('timestamp'),
-                    'severity': result.get('severity')
-                })
-        
+        if not results:
+            return {'campaigns': [], 'total_campaigns': 0, 'affected_ips': []}
+
+        # Group threats by IP with one C-level hash build instead of a
+        # Python dict-append loop over every result
+        df = pd.DataFrame(results)
+        df = df[df['severity'] != 'normal']
+        grouped = df.groupby('identifier', sort=False)['threat_type'].agg(list)
+
         # Detect attack campaigns
         campaigns = []
-        for ip, threats in ip_threats.items():
-            if len(threats) >= 3:
-                threat_types = [t['threat_type'] for t in threats]
-                
+        for ip, threat_types in grouped.items():
+            if len(threat_types) >= 3:
                 # Pattern 1: Reconnaissance → Exploitation → Exfiltration
                 if self._has_attack_progression(threat_types):
                     campaigns.append({
                         'ip': ip,
                         'type': 'Advanced Persistent Threat (APT)',
-                        'threat_count': len(threats),
+                        'threat_count': len(threat_types),
                         'severity': 'CRITICAL',
                         'description': f'Multi-stage attack detected: {" → ".join(set(threat_types[:3]))}'
                     })
-                
+
                 # Pattern 2: Multiple injection attempts
                 elif self._has_repeated_attacks(threat_types):
                     campaigns.append({
                         'ip': ip,
                         'type': 'Automated Attack Campaign',
-                        'threat_count': len(threats),
+                        'threat_count': len(threat_types),
                         'severity': 'HIGH',
-                        'description': f'Repeated attack attempts: {len(threats)} threats from same source'
+                        'description': f'Repeated attack attempts: {len(threat_types)} threats from same source'
                     })
-        
+
         return {
             'campaigns': campaigns,
             'total_campaigns': len(campaigns),
-            'affected_ips': list(ip_threats.keys())
+            'affected_ips': grouped.index.tolist()
         }
-    
+
+    _RECON_TYPES = frozenset(['Reconnaissance', 'Sensitive File Disclosure'])
+    _EXPLOIT_TYPES = frozenset(['SQL Injection', 'XSS', 'Command Injection',
+                                'Path Traversal', 'SSTI', 'RCE'])
+    _EXFIL_TYPES = frozenset(['Data Exfiltration', 'Privilege Escalation'])
+
     def _has_attack_progression(self, threat_types: list) -> bool:
         """Check if threats show progression pattern"""
-        recon_types = ['Reconnaissance', 'Sensitive File Disclosure']
-        exploit_types = ['SQL Injection', 'XSS', 'Command Injection', 'Path Traversal', 'SSTI', 'RCE']
-        exfil_types = ['Data Exfiltration', 'Privilege Escalation']
-        
-        has_recon = any(t in recon_types for t in threat_types)
-        has_exploit = any(t in exploit_types for t in threat_types)
-        has_exfil = any(t in exfil_types for t in threat_types)
-        
-        return has_recon and has_exploit and has_exfil
-    
+        types = set(threat_types)
+        return (
+            not types.isdisjoint(self._RECON_TYPES)
+            and not types.isdisjoint(self._EXPLOIT_TYPES)
+            and not types.isdisjoint(self._EXFIL_TYPES)
+        )
+
     def _has_repeated_attacks(self, threat_types: list) -> bool:
         """Check if same attack type repeated"""
-        from collections import Counter
         counts = Counter(threat_types)
         return any(count >= 3 for count in counts.values())
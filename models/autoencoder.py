@@ -232,6 +232,33 @@ class AutoencoderInference:
         
         self.autoencoder, self.scaler, self.encoder = load_autoencoder(model_path)
         self.reconstruction_errors = None
+        # Inference runs in float32 (Keras computes in float32 natively);
+        # narrowing the scaler parameters once avoids upcasting every
+        # uploaded batch back to float64 in transform
+        if getattr(self.scaler, 'mean_', None) is not None:
+            self.scaler.mean_ = self.scaler.mean_.astype(np.float32)
+            self.scaler.scale_ = self.scaler.scale_.astype(np.float32)
+            # Standardization runs inline in predict; the reciprocal is
+            # precomputed so the hot path multiplies instead of divides
+            self._mean = self.scaler.mean_
+            self._inv_scale = (1.0 / self.scaler.scale_).astype(np.float32)
+        else:
+            self._mean = None
+            self._inv_scale = None
+
+        # Wrap the forward pass in a tf.function traced once at load: a
+        # direct __call__ skips Keras's predict machinery (32-row default
+        # batching, tf.data setup) and the fixed input signature prevents
+        # retracing per upload. The warm-up call pays the tracing cost
+        # here instead of on the first user request.
+        self._infer = None
+        if TENSORFLOW_AVAILABLE and self.autoencoder is not None:
+            num_features = self.autoencoder.input_shape[1]
+            self._infer = tf.function(
+                lambda x: self.autoencoder(x, training=False),
+                input_signature=[tf.TensorSpec([None, num_features], tf.float32)]
+            )
+            self._infer(np.zeros((1, num_features), dtype=np.float32))
     
     def predict(self, X: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
         """
@@ -243,72 +270,132 @@ class AutoencoderInference:
         Returns:
             Tuple of (anomaly_scores, metadata)
         """
+        # Uploads arrive float64 from pandas; half-width rows halve the
+        # bandwidth of the scaler, the forward pass and the MSE reduction
+        X = np.ascontiguousarray(X, dtype=np.float32)
+
         # CRITICAL: Standardize uploaded data using trained scaler
-        X_scaled = self.scaler.transform(X)
+        X_scaled = self._transform(X)
         
         if self.autoencoder is None:
             # Fallback: use statistical method
             logger.warning("Autoencoder model not available, using fallback method")
             return self._fallback_predict(X_scaled)
         
-        # Get reconstructions from uploaded data
-        X_reconstructed = self.autoencoder.predict(X_scaled, verbose=0)
-        
-        # Calculate reconstruction errors for THIS data
-        reconstruction_errors = np.mean(np.square(X_scaled - X_reconstructed), axis=1)
+        # Get reconstructions from uploaded data via the traced forward
+        # pass; the whole batch goes through in one call
+        X_reconstructed = self._infer(X_scaled).numpy()
         
-        # Normalize to 0-1 based on THIS data distribution
-        anomaly_scores = self._normalize_reconstruction_errors(reconstruction_errors)
+        # Calculate reconstruction errors for THIS data. einsum fuses the
+        # square and the row reduction into one pass over the diff, so no
+        # (N, F) squared temporary is materialized
+        diff = X_scaled - X_reconstructed
+        reconstruction_errors = np.einsum('ij,ij->i', diff, diff) / diff.shape[1]
         
+        # Normalize to 0-1 based on THIS data distribution; the stats are
+        # computed once and shared by the normalization and the metadata
+        error_min, error_max, mean_error, std_error = self._error_stats(reconstruction_errors)
+        anomaly_scores = self._normalize_reconstruction_errors(
+            reconstruction_errors, error_min, error_max
+        )
+
         metadata = {
-            'mean_error': float(np.mean(reconstruction_errors)),
-            'std_error': float(np.std(reconstruction_errors)),
-            'max_error': float(np.max(reconstruction_errors)),
-            'min_error': float(np.min(reconstruction_errors)),
+            'mean_error': mean_error,
+            'std_error': std_error,
+            'max_error': error_max,
+            'min_error': error_min,
         }
-        
+
         return anomaly_scores, metadata
-    
+
+    def _transform(self, X: np.ndarray) -> np.ndarray:
+        """
+        Standardize X with the cached scaler parameters in two fused ops
+
+        (X - mean) * inv_scale writes one output buffer and multiplies by
+        the precomputed reciprocal instead of dividing per element. The
+        feature-count check raises the same ValueError wording sklearn
+        would, which the upload handler matches to trigger retraining.
+        Falls back to the scaler when it was never fitted.
+        """
+        if self._mean is None:
+            return self.scaler.transform(X)
+        if X.shape[1] != self._mean.shape[0]:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but StandardScaler is "
+                f"expecting {self._mean.shape[0]} features as input."
+            )
+        X_scaled = np.subtract(X, self._mean)
+        X_scaled *= self._inv_scale
+        return X_scaled
+
+    @staticmethod
+    def _error_stats(errors: np.ndarray) -> Tuple[float, float, float, float]:
+        """
+        (min, max, mean, std) of an error array in two reduction passes
+
+        sum and the squared sum come from one accumulation each instead of
+        separate np.mean/np.std passes that rescan the array
+        """
+        n = errors.size
+        if n == 0:
+            return 0.0, 0.0, 0.0, 0.0
+        total = float(errors.sum())
+        total_sq = float(np.dot(errors, errors))
+        mean = total / n
+        variance = max(total_sq / n - mean * mean, 0.0)
+        return (
+            float(errors.min()), float(errors.max()),
+            mean, float(np.sqrt(variance))
+        )
+
     @staticmethod
-    def _normalize_reconstruction_errors(errors: np.ndarray) -> np.ndarray:
+    def _normalize_reconstruction_errors(
+        errors: np.ndarray, error_min: float, error_max: float
+    ) -> np.ndarray:
         """
         Normalize reconstruction errors to 0-1 range
         Higher error → higher anomaly score
-        
-        CRITICAL: This normalization is based on the CURRENT data distribution
+
+        CRITICAL: This normalization is based on the CURRENT data
+        distribution; the caller passes the min/max it already computed so
+        the array is not rescanned here
         """
-        # Min-max normalization on current data
         if len(errors) == 0:
             return np.array([])
-        
-        error_min = np.min(errors)
-        error_max = np.max(errors)
-        
+
         if error_max == error_min:
-            return np.full_like(errors, 0.5)
-        
-        # Normalize to 0-1 where high error = high score
-        normalized = (errors - error_min) / (error_max - error_min)
-        
+            return np.full(len(errors), 0.5, dtype=np.float32)
+
+        # Normalize to 0-1 where high error = high score, in place on a
+        # float32 copy: one output buffer instead of two float64
+        # temporaries, and the scores are only consumed as float32 anyway
+        normalized = errors.astype(np.float32, copy=True)
+        normalized -= np.float32(error_min)
+        normalized *= np.float32(1.0 / (error_max - error_min))
         return normalized
     
     def _fallback_predict(self, X_scaled: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
         """Fallback prediction using statistical method"""
-        # Use mean absolute deviation as proxy for reconstruction error
-        deviations = np.abs(X_scaled - np.mean(X_scaled, axis=0))
-        mean_deviation = np.mean(deviations, axis=1)
-        
-        # Normalize
-        if np.max(mean_deviation) == 0:
+        # Use mean absolute deviation as proxy for reconstruction error;
+        # the abs runs in place on the centered matrix so only one (N, F)
+        # temporary exists instead of three
+        deviations = X_scaled - X_scaled.mean(axis=0)
+        np.abs(deviations, out=deviations)
+        mean_deviation = deviations.mean(axis=1)
+
+        # Normalize, reusing the same one-shot stats as the real model path
+        error_min, error_max, mean_error, std_error = self._error_stats(mean_deviation)
+        if error_max == 0:
             anomaly_scores = np.full_like(mean_deviation, 0.5)
         else:
-            anomaly_scores = mean_deviation / np.max(mean_deviation)
-        
+            anomaly_scores = mean_deviation / error_max
+
         metadata = {
-            'mean_error': float(np.mean(mean_deviation)),
-            'std_error': float(np.std(mean_deviation)),
-            'max_error': float(np.max(mean_deviation)),
-            'min_error': float(np.min(mean_deviation)),
+            'mean_error': mean_error,
+            'std_error': std_error,
+            'max_error': error_max,
+            'min_error': error_min,
             'method': 'fallback_statistical',
         }
         
@@ -3,11 +3,12 @@ Isolation Forest Model Training and Inference
 Statistical anomaly detection using Isolation Forest
 """
 import numpy as np
-import pickle
+import joblib
 from pathlib import Path
 from typing import Tuple, List, Dict, Any
 import logging
 
+from joblib import parallel_backend
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 
@@ -96,9 +97,10 @@ def save_model(model: IsolationForest, scaler: StandardScaler, filepath: Path) -
     filepath = Path(filepath)
     filepath.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(filepath, 'wb') as f:
-        pickle.dump({'model': model, 'scaler': scaler}, f)
-    
+    # Uncompressed joblib stores the tree arrays as raw blocks, which is
+    # what lets load_model map them instead of deserializing copies
+    joblib.dump({'model': model, 'scaler': scaler}, filepath, compress=0)
+
     logger.info(f"Model saved to {filepath}")
 
 
@@ -113,11 +115,14 @@ def load_model(filepath: Path) -> Tuple[IsolationForest, StandardScaler]:
         save_model(model, scaler, filepath)
         return model, scaler
     
-    with open(filepath, 'rb') as f:
-        data = pickle.load(f)
-        model = data['model']
-        scaler = data['scaler']
-    
+    # mmap_mode='r' pages the estimator arrays in on demand and lets
+    # forked workers share one physical copy; files written by the old
+    # pickle-based save_model still load (joblib reads plain pickles,
+    # just without the mapping)
+    data = joblib.load(filepath, mmap_mode='r')
+    model = data['model']
+    scaler = data['scaler']
+
     logger.info(f"Model loaded from {filepath}")
     return model, scaler
 
@@ -128,7 +133,12 @@ def load_model(filepath: Path) -> Tuple[IsolationForest, StandardScaler]:
 
 class IsolationForestInference:
     """Isolation Forest inference engine"""
-    
+
+    # Rows scored per model call; sklearn materializes an
+    # (n_rows, n_estimators) depths array internally, so chunking keeps
+    # that working set at O(chunk) instead of O(upload size)
+    SCORE_CHUNK = 50_000
+
     def __init__(self, model_path: Path = None):
         """Initialize with optional custom model path"""
         if model_path is None:
@@ -136,6 +146,19 @@ class IsolationForestInference:
             model_path = ISOLATION_FOREST_MODEL_PATH
         
         self.model, self.scaler = load_model(model_path)
+        # Inference runs in float32; narrowing the scaler parameters once
+        # here keeps transform from upcasting every uploaded batch back
+        # to float64
+        if getattr(self.scaler, 'mean_', None) is not None:
+            self.scaler.mean_ = self.scaler.mean_.astype(np.float32)
+            self.scaler.scale_ = self.scaler.scale_.astype(np.float32)
+            # Standardization runs inline in predict; the reciprocal is
+            # precomputed so the hot path multiplies instead of divides
+            self._mean = self.scaler.mean_
+            self._inv_scale = (1.0 / self.scaler.scale_).astype(np.float32)
+        else:
+            self._mean = None
+            self._inv_scale = None
     
     def predict(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -149,21 +172,57 @@ class IsolationForestInference:
             - anomaly_scores: Normalized scores 0-1 (higher = more anomalous)
             - is_anomaly: -1 for anomalies, 1 for normal
         """
+        # Uploads arrive float64 from pandas; half-width rows halve the
+        # bandwidth of the scaler and every tree traversal below
+        X = np.ascontiguousarray(X, dtype=np.float32)
+
         # CRITICAL: Transform uploaded data using trained scaler
-        X_scaled = self.scaler.transform(X)
-        
-        # Get raw anomaly scores from uploaded data
-        # Isolation Forest returns -1 for anomalies, 1 for inliers
-        is_anomaly = self.model.predict(X_scaled)
-        
-        # Get raw scores (lower = more anomalous)
-        raw_scores = self.model.score_samples(X_scaled)
+        X_scaled = self._transform(X)
+
+        # Per-tree scoring honors the active joblib backend; threading
+        # spreads the trees over all cores without pickling the batch the
+        # way a process backend would
+        with parallel_backend('threading', n_jobs=-1):
+            # Isolation Forest returns -1 for anomalies, 1 for inliers
+            is_anomaly = self._chunked(self.model.predict, X_scaled)
+
+            # Get raw scores (lower = more anomalous)
+            raw_scores = self._chunked(self.model.score_samples, X_scaled)
         
         # Normalize scores to 0-1 range based on THIS data
         anomaly_scores = self._normalize_scores(raw_scores)
         
         return anomaly_scores, is_anomaly
-    
+
+    def _transform(self, X: np.ndarray) -> np.ndarray:
+        """
+        Standardize X with the cached scaler parameters in two fused ops
+
+        (X - mean) * inv_scale writes one output buffer and multiplies by
+        the precomputed reciprocal instead of dividing per element. The
+        feature-count check raises the same ValueError wording sklearn
+        would, which the upload handler matches to trigger retraining.
+        """
+        if self._mean is None:
+            return self.scaler.transform(X)
+        if X.shape[1] != self._mean.shape[0]:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but StandardScaler is "
+                f"expecting {self._mean.shape[0]} features as input."
+            )
+        X_scaled = np.subtract(X, self._mean)
+        X_scaled *= self._inv_scale
+        return X_scaled
+
+    def _chunked(self, model_call, X: np.ndarray) -> np.ndarray:
+        """Apply a per-row model call in SCORE_CHUNK-row slices"""
+        if len(X) <= self.SCORE_CHUNK:
+            return model_call(X)
+        return np.concatenate([
+            model_call(X[i:i + self.SCORE_CHUNK])
+            for i in range(0, len(X), self.SCORE_CHUNK)
+        ])
+
     @staticmethod
     def _normalize_scores(raw_scores: np.ndarray) -> np.ndarray:
         """
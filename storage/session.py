@@ -3,68 +3,208 @@ Session Management
 Handles session isolation and data management
 """
 import json
-import uuid
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 import logging
-import shutil
+
+# orjson is optional - used for fast serialization of session metadata
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from config import SESSION_DIR
 
 logger = logging.getLogger(__name__)
 
 
+def _dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to JSON bytes, via orjson when available"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+
+def _fast_rmtree(path: Path) -> None:
+    """
+    Remove a directory tree with scandir + unlink
+
+    DirEntry carries the file type from the directory read itself, so
+    deleting a session costs one unlink per file instead of the extra
+    stat bookkeeping shutil.rmtree does.
+    """
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                _fast_rmtree(Path(entry.path))
+            else:
+                os.unlink(entry.path)
+    os.rmdir(path)
+
+
 # ============================================================================
 # SESSION MODEL
 # ============================================================================
 
 class Session:
     """Represents a user session"""
-    
-    def __init__(self, session_id: str = None):
+
+    # How long the writer thread lets a burst of set() calls accumulate
+    # before serializing the metadata once
+    _DEBOUNCE_SECONDS = 0.1
+
+    def __init__(self, session_id: str = None, _ensure_dir: bool = True):
         """Initialize session"""
-        self.session_id = session_id or str(uuid.uuid4())
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
+        # Same 128 bits of entropy as uuid4 without the UUID object and
+        # formatter; the ID is only ever an opaque filesystem-safe key
+        self.session_id = session_id or os.urandom(16).hex()
+        # Timestamps are integer microseconds; mutators run on every
+        # set() so they skip datetime construction and ISO formatting
+        self.created_at_us = time.time_ns() // 1000
+        self.updated_at_us = self.created_at_us
         self.data = {}
         self.session_dir = SESSION_DIR / self.session_id
-        self.session_dir.mkdir(parents=True, exist_ok=True)
-    
+        # load() passes _ensure_dir=False: the caller has just seen the
+        # directory on disk, so the mkdir syscall would be wasted
+        if _ensure_dir:
+            self.session_dir.mkdir(parents=True, exist_ok=True)
+        # Saves are coalesced: mutators set the dirty event and a daemon
+        # writer thread flushes metadata.json once per burst, so a run of
+        # set() calls costs one serialization instead of one per key
+        self._data_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._alive = True
+        self._writer = threading.Thread(
+            target=self._writer_loop,
+            name=f"session-writer-{self.session_id[:8]}",
+            daemon=True,
+        )
+        self._writer.start()
+
     def set(self, key: str, value: Any) -> None:
         """Set session variable"""
-        self.data[key] = value
-        self.updated_at = datetime.now()
+        with self._data_lock:
+            self.data[key] = value
+            self.updated_at_us = time.time_ns() // 1000
         self._save()
-    
+
+    def update(self, values: Dict[str, Any]) -> None:
+        """Set several session variables with a single save"""
+        with self._data_lock:
+            self.data.update(values)
+            self.updated_at_us = time.time_ns() // 1000
+        self._save()
+
+    def set_payload(self, key: str, value: Any) -> None:
+        """
+        Store a large payload in its own sidecar file
+
+        The payload is written once to <key>.json in the session directory
+        and only a reference is kept in metadata.json, so later set() calls
+        don't re-serialize the whole payload on every save.
+        """
+        payload_file = self.session_dir / f"{key}.json"
+        payload_file.write_bytes(_dumps(value))
+        with self._data_lock:
+            self.data[key] = {'__payload_file__': payload_file.name}
+            self.updated_at_us = time.time_ns() // 1000
+        self._save()
+
     def get(self, key: str, default: Any = None) -> Any:
         """Get session variable"""
-        return self.data.get(key, default)
-    
+        value = self.data.get(key, default)
+        if isinstance(value, dict) and '__payload_file__' in value:
+            payload_file = self.session_dir / value['__payload_file__']
+            try:
+                with open(payload_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Could not load payload {payload_file}: {e}")
+                return default
+        return value
+
     def clear(self) -> None:
         """Clear session data"""
-        self.data = {}
-        self.updated_at = datetime.now()
+        with self._data_lock:
+            self.data = {}
+            self.updated_at_us = time.time_ns() // 1000
+        # Drop sidecar payload files along with the metadata
+        for payload_file in self.session_dir.glob('*.json'):
+            if payload_file.name != 'metadata.json':
+                payload_file.unlink(missing_ok=True)
         self._save()
-    
+
+    def close(self) -> None:
+        """
+        Flush any pending save and stop the writer thread
+
+        The writer thread keeps the session object alive, so an evicted
+        session must be closed for its memory to actually be reclaimed;
+        disk keeps the state and load() brings it back on demand.
+        """
+        flush_pending = self._dirty.is_set()
+        self._alive = False
+        self._dirty.set()
+        if flush_pending:
+            self._flush()
+
     def delete(self) -> None:
         """Delete entire session"""
+        # Stop the writer first so a pending flush can't resurrect
+        # metadata.json after the directory is removed
+        self._alive = False
+        self._dirty.set()
         if self.session_dir.exists():
-            shutil.rmtree(self.session_dir)
+            _fast_rmtree(self.session_dir)
         logger.info(f"Session {self.session_id} deleted")
-    
+
     def _save(self) -> None:
-        """Save session to disk"""
-        metadata = {
-            'session_id': self.session_id,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'data': self._serialize_data(self.data),
-        }
-        
+        """Mark the session dirty; the writer thread flushes to disk"""
+        self._dirty.set()
+
+    def _writer_loop(self) -> None:
+        """Flush metadata when dirty, coalescing bursts of mutations"""
+        while True:
+            self._dirty.wait()
+            if not self._alive:
+                break
+            # Let the rest of a burst of set() calls land before
+            # serializing once
+            time.sleep(self._DEBOUNCE_SECONDS)
+            self._dirty.clear()
+            if not self._alive:
+                break
+            self._flush()
+
+    def _flush(self) -> None:
+        """Write session metadata to disk atomically"""
+        with self._data_lock:
+            metadata = {
+                'session_id': self.session_id,
+                'created_at_us': self.created_at_us,
+                'updated_at_us': self.updated_at_us,
+                'data': self._serialize_data(self.data),
+            }
+
+        # Write-then-rename so readers never see a half-written file
         metadata_file = self.session_dir / 'metadata.json'
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        tmp_file = self.session_dir / 'metadata.json.tmp'
+        try:
+            tmp_file.write_bytes(_dumps(metadata, indent=True))
+            os.replace(tmp_file, metadata_file)
+        except OSError as e:
+            logger.warning(f"Could not save session {self.session_id}: {e}")
     
     @staticmethod
     def _serialize_data(data: Dict[str, Any]) -> Dict[str, Any]:
@@ -100,24 +240,35 @@ class Session:
     @classmethod
     def load(cls, session_id: str) -> 'Session':
         """Load session from disk"""
-        session = cls(session_id)
+        session = cls(session_id, _ensure_dir=False)
         metadata_file = session.session_dir / 'metadata.json'
         
         if metadata_file.exists():
             with open(metadata_file, 'r') as f:
                 metadata = json.load(f)
                 session.data = metadata.get('data', {})
-                session.created_at = datetime.fromisoformat(metadata.get('created_at'))
-                session.updated_at = datetime.fromisoformat(metadata.get('updated_at'))
-        
+                if 'created_at_us' in metadata:
+                    session.created_at_us = metadata['created_at_us']
+                    session.updated_at_us = metadata['updated_at_us']
+                else:
+                    # Files written before the integer-microsecond format
+                    # carry ISO strings
+                    session.created_at_us = int(
+                        datetime.fromisoformat(metadata['created_at']).timestamp() * 1_000_000
+                    )
+                    session.updated_at_us = int(
+                        datetime.fromisoformat(metadata['updated_at']).timestamp() * 1_000_000
+                    )
+
         return session
-    
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert session to dictionary"""
+        # ISO timestamps are a human-facing view, formatted only here
         return {
             'session_id': self.session_id,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
+            'created_at': datetime.fromtimestamp(self.created_at_us / 1e6).isoformat(),
+            'updated_at': datetime.fromtimestamp(self.updated_at_us / 1e6).isoformat(),
             'data_keys': list(self.data.keys()),
         }
 
@@ -128,74 +279,113 @@ class Session:
 
 class SessionManager:
     """Manages multiple sessions"""
-    
+
+    # Bound on sessions held in memory; disk stays the source of truth,
+    # so an evicted session just reloads on its next request
+    MAX_CACHED_SESSIONS = 1024
+
     def __init__(self, session_timeout_hours: int = 1):
         """Initialize session manager"""
         self.session_timeout = timedelta(hours=session_timeout_hours)
-        self.sessions = {}
-    
+        # Insertion order doubles as recency order: hits move to the
+        # end, evictions pop from the front
+        self.sessions = OrderedDict()
+        # Guards self.sessions against the background cleanup thread
+        self._lock = threading.Lock()
+
     def create_session(self) -> Session:
         """Create new session"""
         session = Session()
-        self.sessions[session.session_id] = session
+        self._cache_session(session)
         logger.info(f"Session created: {session.session_id}")
         return session
-    
+
+    def _cache_session(self, session: Session) -> None:
+        """Remember a session in memory, evicting the least recent"""
+        evicted = []
+        with self._lock:
+            self.sessions[session.session_id] = session
+            self.sessions.move_to_end(session.session_id)
+            while len(self.sessions) > self.MAX_CACHED_SESSIONS:
+                evicted.append(self.sessions.popitem(last=False)[1])
+        # close() outside the lock: it may flush to disk
+        for old_session in evicted:
+            old_session.close()
+
     def get_session(self, session_id: str) -> Optional[Session]:
         """Get session by ID"""
-        if session_id in self.sessions:
-            return self.sessions[session_id]
-        
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+                return session
+
         # Try to load from disk
         session_dir = SESSION_DIR / session_id
         if session_dir.exists():
             try:
                 session = Session.load(session_id)
-                self.sessions[session_id] = session
+                self._cache_session(session)
                 return session
             except Exception as e:
                 logger.error(f"Error loading session {session_id}: {e}")
                 return None
-        
+
         return None
-    
+
     def delete_session(self, session_id: str) -> bool:
         """Delete session"""
-        if session_id in self.sessions:
-            self.sessions[session_id].delete()
-            del self.sessions[session_id]
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.delete()
             return True
         return False
-    
+
     def cleanup_expired_sessions(self) -> int:
         """Remove expired sessions"""
-        deleted_count = 0
         now = datetime.now()
-        
-        for session_dir in SESSION_DIR.iterdir():
-            if not session_dir.is_dir():
-                continue
-            
-            try:
-                metadata_file = session_dir / 'metadata.json'
-                if metadata_file.exists():
-                    with open(metadata_file, 'r') as f:
-                        metadata = json.load(f)
-                        updated_at = datetime.fromisoformat(metadata.get('updated_at'))
-                        
-                        if now - updated_at > self.session_timeout:
-                            shutil.rmtree(session_dir)
-                            deleted_count += 1
-                            if session_dir.name in self.sessions:
-                                del self.sessions[session_dir.name]
-            except Exception as e:
-                logger.warning(f"Error processing session {session_dir.name}: {e}")
-        
+
+        entries = [
+            entry for entry in os.scandir(SESSION_DIR)
+            if entry.is_dir(follow_symlinks=False)
+        ]
+        if not entries:
+            return 0
+
+        # Each candidate is one stat plus, for expired sessions, a tree
+        # removal; the pool overlaps those I/O waits instead of paying
+        # the long tail serially
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            deleted_count = sum(
+                pool.map(partial(self._maybe_delete, now=now), entries)
+            )
+
         if deleted_count > 0:
             logger.info(f"Cleaned up {deleted_count} expired sessions")
-        
+
         return deleted_count
 
+    def _maybe_delete(self, entry: os.DirEntry, now: datetime) -> bool:
+        """Delete one session directory if its metadata mtime has expired"""
+        try:
+            metadata_file = Path(entry.path) / 'metadata.json'
+            # The file's mtime tracks the last save, which tracks
+            # updated_at; one stat per session replaces a JSON parse
+            try:
+                updated_at = datetime.fromtimestamp(metadata_file.stat().st_mtime)
+            except FileNotFoundError:
+                return False
+
+            if now - updated_at > self.session_timeout:
+                _fast_rmtree(Path(entry.path))
+                with self._lock:
+                    self.sessions.pop(entry.name, None)
+                return True
+        except Exception as e:
+            logger.warning(f"Error processing session {entry.name}: {e}")
+        return False
+
 
 # ============================================================================
 # GLOBAL SESSION MANAGER